@@ -0,0 +1,227 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import statistics
+from contextlib import contextmanager, redirect_stdout
+import cobra
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Utils'))
+from run_fba import fba, get_session
+from set_dms import MEDIA, register_medium, set_dm
+from pe_utils import pe_Data, phase_minMax_sim
+from exchange_map import translate_id
+import sim_cache
+
+########## Core simulation benchmarks ##########
+#   Times the simulation paths the figure and validation scripts are built on, on the two third-party LGG models shipped in Model/:
+        # fba: repeated FBA on a media-constrained model (warm FBASession)
+        # set_dm: switching between the two benchmark media
+        # pe_Data: lactate production envelope, fixed 10-point grid and adaptive breakpoint search
+        # dropout: single-component media dropout loop, one slim solve per component (as in validation_scripts_annotated)
+        # phase_minMax_sim: FVA-based reduction of one envelope phase followed by FBA on the reduced model
+#   For every benchmark the wall time (median of repeats), the number of LP solves, the Python peak memory (tracemalloc) and a result value are recorded
+#   Results are compared against a stored baseline JSON. Run with --update-baseline to (re)write it on the reference machine
+#   Usage:
+        # python core_simulation_benchmarks.py                      compare against Benchmarks/baseline.json
+        # python core_simulation_benchmarks.py --update-baseline    store this run as the baseline
+#   Cobrapy Version: 0.29.1, Python Version: 3.9.12
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(HERE, '..', 'Model')
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+#Benchmark models. The DM57 and Sun media are translated from the iGR632 namespace to each model's exchange IDs by translate_medium (naming rules and overrides in exchange_map)
+MODELS = {
+    'AGORA': {
+        'file': 'AGORA1.02-Lactobacillus_rhamnosus_GG_ATCC_53103.xml',
+        'objective': 'biomass205',
+        'lactate': 'EX_lac_L(e)',
+    },
+    'MERLIN': {
+        'file': 'MERLIN-iCC568.xml',
+        'objective': 'e_Biomass',
+        'lactate': 'EX_lac__L_e',
+    },
+}
+BENCH_MEDIA = ['57', 'sun']
+
+def translate_medium(model, model_name, medium):
+    """
+    Registers the benchmark version of an iGR632 medium for one model. Components without a matching exchange are left out, so the benchmark media are fixed for a given model file.
+    Returns the registry name and the number of components left out.
+    """
+    composition = {}
+    for rxn_id, lb in MEDIA[medium].items():
+        mapped = translate_id(rxn_id, model_name)
+        if mapped in model.reactions:
+            composition[mapped] = lb
+    name = f"bench_{model_name}_{medium}"
+    register_medium(name, composition)
+    return name, len(MEDIA[medium]) - len(composition)
+
+@contextmanager
+def count_solves():
+    """
+    Counts every LP solve made by any optlang model while the block runs, including those on model copies and inside FVA.
+    """
+    counter = {'n': 0}
+    solver_classes = {type(cobra.Model().solver)}
+    originals = {cls: cls.optimize for cls in solver_classes}
+    def make_counting(original):
+        def optimize(self, *args, **kwargs):
+            counter['n'] += 1
+            return original(self, *args, **kwargs)
+        return optimize
+    for cls, original in originals.items():
+        cls.optimize = make_counting(original)
+    try:
+        yield counter
+    finally:
+        for cls, original in originals.items():
+            cls.optimize = original
+
+def measure(func, repeats):
+    """
+    Runs func repeats times for the wall time (median), then once more under tracemalloc for the peak Python memory.
+    func returns a float that identifies the result, compared against the baseline as a correctness check.
+    """
+    times = []
+    with count_solves() as counter:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            value = func()
+            times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'time_s': statistics.median(times),
+        'time_min_s': min(times),
+        'lp_solves': counter['n'] // repeats,
+        'peak_mb': peak / 2**20,
+        'value': float(value),
+    }
+
+def model_benchmarks(model_name, repeats):
+    """
+    Builds and runs the benchmarks for one model. Returns {benchmark name: measurements}.
+    """
+    spec = MODELS[model_name]
+    model = cobra.io.read_sbml_model(os.path.join(MODEL_DIR, spec['file']))
+    objective, lactate = spec['objective'], spec['lactate']
+    media = {}
+    for medium in BENCH_MEDIA:
+        media[medium], skipped = translate_medium(model, model_name, medium)
+        print(f"{model_name}: DM{medium} translated, {skipped} components not in model")
+    main = media['57']
+    set_dm(model, main)
+    max_bm = fba(model, objective).objective_value
+
+    def bench_fba():
+        return sum(fba(model, objective).objective_value for _ in range(20)) / 20
+
+    def bench_set_dm():
+        with redirect_stdout(io.StringIO()):    #set_dm echoes every switch
+            for _ in range(10):
+                set_dm(model, media['sun'])
+                set_dm(model, main)
+        return model.slim_optimize()
+
+    def bench_pe_grid():
+        results = pe_Data(model, objective=objective, target=lactate, num_points=10)
+        return sum(hi for lo, hi in results.values())
+
+    def bench_pe_adaptive():
+        results = pe_Data(model, objective=objective, target=lactate, adaptive=True)
+        return len(results)
+
+    def bench_dropout():
+        session = get_session(model)
+        total = 0.0
+        for rxn_id in MEDIA[main]:
+            session.set_bounds(rxn_id, lower_bound=0)
+            growth = session.slim_optimize(objective, error_value=0.0)
+            total += growth / max_bm if max_bm else 0.0
+            session.reset(rxn_id)
+        return total
+
+    def bench_phase():
+        with model:
+            shadow_prices, reduced_costs = phase_minMax_sim(model, 0.0, 0.5 * max_bm, objective, objective)
+        return float(np.abs(shadow_prices.values).sum())
+
+    benchmarks = {
+        'fba': bench_fba,
+        'set_dm': bench_set_dm,
+        'pe_Data_grid': bench_pe_grid,
+        'pe_Data_adaptive': bench_pe_adaptive,
+        'dropout': bench_dropout,
+        'phase_minMax_sim': bench_phase,
+    }
+    results = {}
+    for name, func in benchmarks.items():
+        results[f"{model_name}/{name}"] = measure(func, repeats)
+        r = results[f"{model_name}/{name}"]
+        print(f"{model_name}/{name}: {r['time_s']*1e3:.1f} ms, {r['lp_solves']} LPs, {r['peak_mb']:.1f} MB")
+    return results
+
+def compare(results, baseline, time_tol=0.25, mem_tol=0.25, value_tol=1e-6):
+    """
+    Compares a run against the baseline. Returns a list of regression messages, empty if none.
+    Flags wall time or peak memory above baseline by more than time_tol / mem_tol (fractions), any change in LP solve count and result values that differ by more than value_tol (relative).
+    """
+    problems = []
+    for name, base in baseline['results'].items():
+        run = results.get(name)
+        if run is None:
+            problems.append(f"{name}: missing from this run")
+            continue
+        if run['time_s'] > base['time_s'] * (1 + time_tol):
+            problems.append(f"{name}: time {run['time_s']:.4f}s vs baseline {base['time_s']:.4f}s")
+        if run['peak_mb'] > base['peak_mb'] * (1 + mem_tol):
+            problems.append(f"{name}: peak memory {run['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+        if run['lp_solves'] != base['lp_solves']:
+            problems.append(f"{name}: {run['lp_solves']} LP solves vs baseline {base['lp_solves']}")
+        if abs(run['value'] - base['value']) > value_tol * max(1.0, abs(base['value'])):
+            problems.append(f"{name}: result {run['value']!r} vs baseline {base['value']!r}")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for fba, set_dm, pe_Data, the dropout loop and phase_minMax_sim")
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--time-tol', type=float, default=0.25)
+    args = parser.parse_args()
+
+    sim_cache.disable()    #every call must reach the solver
+    cobra.Configuration().processes = 1    #FVA in one process, so timings and solve counts are comparable between machines
+    results = {}
+    for model_name in args.models:
+        results.update(model_benchmarks(model_name, args.repeats))
+    run = {
+        'results': results,
+        'cobra': cobra.__version__,
+        'python': sys.version.split()[0],
+        'solver': cobra.Configuration().solver.__name__,
+    }
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+        print(f"Baseline written: {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline first")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, time_tol=args.time_tol)
+        for problem in problems:
+            print("REGRESSION " + problem)
+        print(f"{len(problems)} regressions against {args.baseline}")
+        sys.exit(1 if problems else 0)
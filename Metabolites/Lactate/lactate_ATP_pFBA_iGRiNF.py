@@ -1,8 +1,8 @@
 
 import cobra
 import pandas as pd
-from cobra.flux_analysis import flux_variability_analysis
-from set_dms import set_dm
+from run_fba import fva
+from set_dms import applied_medium
 
 ########## Functions Required  ##########
 #   phase_minMax_pFBA works by running FVA on a range-locked biomass objective and generating a reduced model where only reactions carrying flux and their metabolites are retained. 
@@ -11,7 +11,7 @@ from set_dms import set_dm
 # make_cytoscape_edges converts the fluxes from phase_minMax_pFBA into a csv table readable by cytoscape, while excluding common secondary metabolites from the file. 
 def phase_minMax_pFBA(model, objective_rxn):
     results={}
-    x=flux_variability_analysis(model)
+    x=fva(model)
     reduced_model=model.copy()
     to_remove=[]
     for rxn, results in x.iterrows():
@@ -85,7 +85,7 @@ def make_cytoscape_edges(model, flux_dict=None, exclude=None):
 ########## Asessing iGR632  ##########
 #   This code does the following steps
         # Replace the biomass function with demands for each pseudometabolite to better assess each pathway, rather than how they might work together to support biomass 
-        # Sets DM conditions and creates a seperate model foe each condition
+        # Sets DM conditions one at a time on the same model (applied_medium restores the exchanges afterwards, `with model:` undoes the LDH_L knockout)
         # runs the specific pFBA simulation to get the minimum path to ATP maintaince in each condition
         # Filters out all of the 0 flux reactions and generates a cytoscape input file for visualization 
 
@@ -99,14 +99,15 @@ ATPmodel.add_boundary(ATPmodel.metabolites.M8807_c, type='demand')
 ATPmodel.add_boundary(ATPmodel.metabolites.M8811_c, type='demand')
 ATPmodel.add_boundary(ATPmodel.metabolites.e_Lipid_c, type='demand')
 ATPmodel.remove_reactions(['BM_noATP'])
-lac_tmodelc25, media25 = set_dm(ATPmodel, '25')
-lac_tmodelc57, media57 = set_dm(ATPmodel, '57')
-
 phase_25_lac_results={}
-fluxes_25 = phase_minMax_pFBA(lac_tmodelc25, 'ATPM')
+with applied_medium(ATPmodel, '25') as (lac_tmodelc25, media25):
+    with lac_tmodelc25:
+        fluxes_25 = phase_minMax_pFBA(lac_tmodelc25, 'ATPM')
 
 phase_57_lac_results={}
-fluxes_57=phase_minMax_pFBA(lac_tmodelc57, 'ATPM')
+with applied_medium(ATPmodel, '57') as (lac_tmodelc57, media57):
+    with lac_tmodelc57:
+        fluxes_57=phase_minMax_pFBA(lac_tmodelc57, 'ATPM')
     
 nonzero_rxns_57={}
 for rxn, flux in fluxes_57.items():
@@ -160,7 +161,6 @@ edges_combined.to_csv("cleaned_cytoscape_merged.csv", index=False)
         # Filters out all of the 0 flux reactions and generates a cytoscape input file for visualization import cobra
 import os 
 import pandas as pd
-from cobra.flux_analysis import flux_variability_analysis
 model = cobra.io.read_sbml_model('iNF517.xml')
 for i in model.reactions.BIOMASS_LLA_noATPnoH.metabolites:
     model.add_boundary(i, type='demand')
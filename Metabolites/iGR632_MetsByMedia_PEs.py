@@ -1,5 +1,8 @@
-from set_dms import set_dm 
+from set_dms import applied_medium
+from flux_snapshots import flux_snapshots, compare_snapshots
 from pe_utils import pe_Data, plot_production_envelope_single
+from figure_render import save_figure
+from model_index import get_index
 from cobra.io import read_sbml_model 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,16 +10,16 @@ import matplotlib.pyplot as plt
 ############################ Generating single PEs for different metabolites in iGR632 ############################
 #   Uses two functions from pe_utils to generate seperate production envelopes for lactate and i3a against biomass
 #   A dictionary of media conditions and corresponding colors is looped through to:
-        # Set proper media conditions using set_DM
-        # Generate lactate and I3A production envelope-ready data dicts using pe_Data
+        # Set proper media conditions using applied_medium (set_DM as a context, bounds are restored after each condition instead of copying the model)
+        # Generate lactate and I3A production envelope-ready data dicts using pe_Data, both targets in one sweep so biomass is pinned once per point
         # Single curve production envelopes for each metabolite and media condition are generated using plot_production_envelope_single 
 model= read_sbml_model('iGR632.xml')
 media={'57': '#6e9869', '25': '#5c67a8'}
 for media_name, color in media.items():
-    model_run= model.copy()
-    model_set, media_dict= set_dm(model_run, media_name) 
-    results_lac=pe_Data(model_set, target='EX_lac_L_e', num_points=10)
-    results_i3a=pe_Data(model_set, target='EX_I3A_e', num_points=10)
+    with applied_medium(model, media_name) as (model_set, media_dict):
+        results=pe_Data(model_set, target=['EX_lac_L_e', 'EX_I3A_e'], num_points=10)
+    results_lac=results['EX_lac_L_e']
+    results_i3a=results['EX_I3A_e']
     title_lac= str( media_name + " Lactate Flux PE")
     filename_lac= str( media_name + "_lac_PE")
     title_i3a= str( media_name + " I3A Flux PE")
@@ -27,9 +30,9 @@ for media_name, color in media.items():
 ############################ Identifying Phases of Changing Slope ############################
 #   Uses two functions from pe_utils to generate identify regions where the slope changes for lactate PEs
 #   A dictionary of media conditions and corresponding colors is looped through to:
-        # Set proper media conditions using set_DM
-        # Generate lactate production envelope-ready data dicts using pe_Data
-        # identify periods of slope changes using detect_slope_changes_pe
+        # Set proper media conditions using applied_medium
+        # Generate lactate production envelope-ready data dicts using pe_Data in adaptive mode, which returns the exact breakpoints of the envelope instead of a 10 point grid
+        # identify periods of slope changes using detect_slope_changes_pe (every interior point of an adaptive result is a breakpoint, the threshold keeps only the meaningful ones)
         # Using the results, shading was performed in Adobe Illustrator to visually identify detected phases 
 
 def detect_slope_changes_pe(pe_dict, which='max', threshold=0.1, return_absolute_diff=False):
@@ -85,94 +88,24 @@ model= read_sbml_model('iGR632.xml')
 media={'57': '#6e9869', '25': '#5c67a8'}
 changed={}
 for media_name, color in media.items():
-    model_run= model.copy()
-    model_set, media_dict= set_dm(model_run, media_name) 
-    results_lac=pe_Data(model_set, target='EX_lac_L_e', num_points=10)
+    with applied_medium(model, media_name) as (model_set, media_dict):
+        results_lac=pe_Data(model_set, target='EX_lac_L_e', adaptive=True)
     x=detect_slope_changes_pe(results_lac)
-    changed[media]= x
+    changed[media_name]= x
 print(changed)
 
 ############################ Characterizing Changes in Rxns Across Slope Change Phases ############################
 #   Using the slope phases identified, this step creates figures that allow for the visual assessment of the reactions changing 
-#   Uses additional scripts to perform flux value extaction, calculate differences, filter by meaningful differences, and sort reactions into categories 
-
-def get_flux_results(model, biomass_values, objective='curated_biomass'):
-    results = {}
-    for bm_val in biomass_values:
-        mcopy = model.copy()
-        mcopy.reactions.get_by_id(objective).bounds = (0, bm_val)
-        sol = fba(mcopy)
-        results[bm_val] = sol.fluxes
-    return results
-
-def compare_fluxes(results_dict, val1, val2, abs_tol=1e-6):
-    """
-    Compare flux distributions between two conditions, normalized by biomass.
-
-    Parameters:
-        results_dict (dict): Dictionary of {value: flux_series}
-        val1 (float): First biomass value (also key in results_dict)
-        val2 (float): Second biomass value (also key in results_dict)
-        abs_tol (float): Tolerance for considering flux changes as nonzero
-
-    Returns:
-        DataFrame with normalized fluxes and their differences
-    """
-    # Normalize all fluxes by their biomass value
-    flux1 = results_dict[val1] / val1
-    flux2 = results_dict[val2] / val2
-
-    # Calculate difference
-    diff = flux2 - flux1
-    df = pd.DataFrame({
-        f'flux_{val1}_norm': flux1,
-        f'flux_{val2}_norm': flux2,
-        'flux_difference': diff
-    })
-
-    # Keep only reactions above tolerance
-    changed_df = df[df['flux_difference'].abs() > abs_tol]
-    changed_df = changed_df.sort_values(by='flux_difference', key=abs)
-
-    return changed_df
-
-def filter_flux_changes(df, threshold=1e-3):
-    """
-    Filter reactions with flux difference above a threshold.
-    
-    Parameters:
-        df (DataFrame): Output from compare_fluxes()
-        threshold (float): Minimum absolute difference to include
-        
-    Returns:
-        Filtered DataFrame
-    """
-    return df[df['flux_difference'].abs() > threshold].copy()
-
-def exclude_reactions_from_df(df, exclude_exact=None, exclude_prefix=None):
-    """
-    Exclude reactions from the DataFrame by exact name or by prefix.
-
-    Parameters:
-        df (DataFrame): Flux comparison DataFrame with reaction IDs as index.
-        exclude_exact (list): List of exact reaction IDs to exclude.
-        exclude_prefix (list): List of string prefixes to exclude.
-
-    Returns:
-        Filtered DataFrame
-    """
-    exclude_exact = exclude_exact or []
-    exclude_prefix = exclude_prefix or []
-
-    # Build exclusion mask
-    mask = df.index.isin(exclude_exact)
-    for prefix in exclude_prefix:
-        mask |= df.index.str.startswith(prefix)
+#   Uses additional scripts to perform flux value extaction (flux_snapshots: all biomass values of a medium solved on one model, no copies), calculate differences and filter by meaningful differences (compare_snapshots: all consecutive pairs in one array pass), and sort reactions into categories 
 
-    return df[~mask].copy()
+def get_flux_results(model, biomass_values, objective='curated_biomass', parsimonious=True):
+    # One solve per biomass value on the model itself (objective bounds (0, value), restored afterwards), collected in one reactions x values array
+    # parsimonious: minimal total flux (pFBA) at each value, so the phase comparisons diff unique distributions rather than arbitrary FBA optima
+    # results[bm_val] still returns the flux Series of that value
+    return flux_snapshots(model, biomass_values, objective=objective, parsimonious=parsimonious)
 
 def plot_flux_changes_4_panels(df, title_prefix="Filtered Flux Changes (>0.05) Normalized to Biomass: ",
-                                extracellular_containing=None, baseline_value=None):
+                                extracellular_containing=None, baseline_value=None, filename=None):
     extracellular_containing = extracellular_containing or []
 
     # Classify reactions
@@ -221,22 +154,24 @@ def plot_flux_changes_4_panels(df, title_prefix="Filtered Flux Changes (>0.05) N
     plot_on_ax(axs[3], down_met, "↓ Internal Metabolic Reactions", 'salmon')
 
     plt.tight_layout(rect=[0, 0, 1, 0.96])  # Leave space for title
-    plt.show()
+    if filename:
+        save_figure(filename)
+    else:
+        plt.show()
 
-extracellular_containing = []
-for rxn in model.reactions:
-    if any("_e" in met.id for met in rxn.metabolites):
-        extracellular_containing.append(rxn.id)
+extracellular_containing = get_index(model).reactions_in('extracellular')
 
 media={'57': '#6e9869', '25': '#5c67a8'}
 for media_name, color in media.items():
-    model_set, media_type = set_dm(model.copy(), media_name)
     bm_values = sorted({cp['A'] for cp in changed[media_name]} | {cp['B'] for cp in changed[media_name]} | {cp['C'] for cp in changed[media_name]})
-    bm_results = get_flux_results(model_set, bm_values)
+    with applied_medium(model, media_name) as (model_set, media_type):
+        bm_results = get_flux_results(model_set, bm_values)
+    # All consecutive pairs at once: normalized by biomass, changes above 0.05, biomass and e_/DM_ reactions excluded
+    changes = compare_snapshots(bm_results, threshold=0.05, exclude_exact=['curated_biomass'], exclude_prefix=['e_', 'DM_'])
+    by_pair = {pair: df.set_index('reaction') for pair, df in changes.groupby(['val1', 'val2'], sort=False)}
     for i in range(len(bm_values) - 1):
-    val1, val2 = bm_values[i], bm_values[i + 1]
-    desc = f"{val1:.5f} vs {val2:.5f}"
-    df = compare_fluxes(bm_results, val1, val2)
-    df_filtered = filter_flux_changes(df, threshold=0.05)
-    df_clean = exclude_reactions_from_df(df_filtered, exclude_exact=['curated_biomass'], exclude_prefix=['e_', 'DM_'])
-    plot_flux_changes_4_panels(df_clean, title_prefix=f"Flux Changes {desc} (Medium {media_name}, Lactate)",extracellular_containing=extracellular_containing,baseline_value=val1)
+        val1, val2 = bm_values[i], bm_values[i + 1]
+        desc = f"{val1:.5f} vs {val2:.5f}"
+        df_clean = by_pair.get((val1, val2), changes.iloc[:0].set_index('reaction'))
+        plot_flux_changes_4_panels(df_clean, title_prefix=f"Flux Changes {desc} (Medium {media_name}, Lactate)",extracellular_containing=extracellular_containing,baseline_value=val1,
+                                   filename=f"flux_changes_DM{media_name}_{val1:.5f}_{val2:.5f}.svg")
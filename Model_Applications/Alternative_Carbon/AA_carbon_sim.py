@@ -6,7 +6,7 @@
 
 import cobra 
 from set_dms import set_dm
-from run_fba import fba
+from run_fba import fba, get_session
 
 model = cobra.io.read_sbml_model('iGR632_v37.xml')
 set_model = set_dm(model, 'model_min')
@@ -32,6 +32,7 @@ amino_acids = {
 }
 
 # === Full glucose condition ===
+session = get_session(model2)
 glc_fba = fba(model2)
 print("-10 Glc: " + str(glc_fba.objective_value))
 model2.reactions.EX_glc_D_e.lower_bound = -0.05
@@ -39,13 +40,14 @@ changed_fba = fba(model2)
 print("-1 Glc: " + str(changed_fba.objective_value))
 
 # === Amino acid  ===
+#   Each amino acid is a one-bound change on the same LP, so the session applies the delta and warm starts from the previous solve
 aa_results = {}
 for amino_acid, concentration in amino_acids.items():
     flag=0
-    og_concentration = model2.reactions.get_by_id(amino_acid).lower_bound
-    model2.reactions.get_by_id(amino_acid).lower_bound = concentration
-    aa_fba = fba(model2)
-    if aa_fba.objective_value > changed_fba.objective_value:
+    session.set_bounds(amino_acid, lower_bound=concentration)
+    aa_growth = session.slim_optimize('curated_biomass')
+    aa_results[amino_acid] = aa_growth
+    if aa_growth > changed_fba.objective_value:
         flag=1
-        print(amino_acid + ": "+ str(aa_fba.objective_value/changed_fba.objective_value)+ " ; improved")
-    model2.reactions.get_by_id(amino_acid).lower_bound = og_concentration
+        print(amino_acid + ": "+ str(aa_growth/changed_fba.objective_value)+ " ; improved")
+    session.reset(amino_acid)
@@ -4,10 +4,12 @@ import matplotlib.pyplot as plt
 import statistics
 from matplotlib.lines import Line2D
 import pandas as pd
+from data_loader import read_excel_cached
 
 excel_path = "arg_iso_cleaned.xlsx"
+sheet_name = "data"
 
-df = pd.read_excel(excel_path, sheet_name=sheet_name)
+df = read_excel_cached(excel_path, sheet_name=sheet_name)
 
 
 df.rename(columns={df.columns[0]: "Duration"}, inplace=True)
@@ -0,0 +1,34 @@
+import cobra
+import time
+from minimal_media import greedy_minimal_medium, alternative_minimal_media, milp_minimal_medium
+########################## NOTES ON MINIMAL MEDIA SEARCH ##########################
+#   This script derives minimal media from base media automatically, instead of by hand as for the DM57 -> DM25 -> DM16 -> DM13 -> DM7 series
+#   Steps of analysis:
+        #   load in model
+        #   For each base medium, find an irreducible subset of its components that keeps growth above FRACTION of the full-medium growth (greedy_minimal_medium, warm-started solves)
+        #   Enumerate up to N_ALTERNATIVES different minimal media by forbidding components of the media found (alternative_minimal_media)
+        #   Optionally check the greedy result against the exact minimum size from the MILP (USE_MILP, slower)
+        #   Save the alternatives of each base medium to csv
+#   Any medium added with register_medium can be listed in BASE_MEDIA, e.g. candidate base media
+
+FRACTION = 0.25
+N_ALTERNATIVES = 10
+USE_MILP = False
+BASE_MEDIA = ['57', '25', '16', '13', 'sun']
+
+if __name__ == "__main__":
+    tmodelc = cobra.io.read_sbml_model('iGR632_v37.xml')
+    for dm in BASE_MEDIA:
+        start = time.perf_counter()
+        medium, growth, full_growth = greedy_minimal_medium(tmodelc, dm, fraction=FRACTION)
+        alternatives, _ = alternative_minimal_media(tmodelc, dm, n=N_ALTERNATIVES, fraction=FRACTION)
+        print(f"DM{dm}: full growth {full_growth:.3f}, minimal medium of {len(medium)} components (growth {growth:.3f}), "
+              f"{len(alternatives)} alternatives, {time.perf_counter() - start:.1f} s")
+        print("   " + ", ".join(medium))
+        if USE_MILP:
+            exact, _ = milp_minimal_medium(tmodelc, dm, fraction=FRACTION)
+            if exact:
+                print(f"   MILP minimum: {len(exact[0])} components")
+        alternatives['exchanges'] = alternatives['exchanges'].map("|".join)
+        alternatives['forbidden'] = alternatives['forbidden'].map("|".join)
+        alternatives.to_csv(f"DM{dm}_minimal_media.csv", index=False)
@@ -1,37 +1,208 @@
-from cobra
-from run_fba import fba
+from contextlib import contextmanager
+from run_fba import get_session, fba, fva
+from sim_cache import cached
+from sim_trace import traced, span
+from figure_render import apply_style, save_figure
 import numpy as np
-from cobra.flux_analysis import flux_variability_analysis
 import matplotlib.pyplot as plt
 
-def pe_Data(model, objective='curated_biomass', target, num_points=10):
+@traced
+@cached
+def pe_Data(model, objective='curated_biomass', target=None, num_points=10, adaptive=False, tol=1e-6, min_width=None):
     """
     Generates the data needed to plot a production envlope between the objective function and a target function across the full range of objective flux values
 
     Args:
         model (Cobra model): CB model to run simulation on 
         objective (str): desired objective function for simulation. Default is iGR632 LGG model biomass function 'curated_biomass', but could be any model rxn. X-axis on the production envelope 
-        target (str): desired target reaction to interrogate. Y-axis on the production envelope
-        num_points (int): number of objective value points to be assessed in the FVA range 
+        target (str or list): desired target reaction to interrogate. Y-axis on the production envelope. A list of reaction IDs computes every envelope in one sweep
+        num_points (int): number of objective value points to be assessed in the FVA range. Ignored when adaptive=True
+        adaptive (bool): if True, find the breakpoints of the envelope instead of sampling a fixed grid (see breakpoint_search)
+        tol (float): relative tolerance for calling three points collinear in adaptive mode
+        min_width (float): narrowest objective interval bisected in adaptive mode. Default is 1/1000 of the objective range
     Returns: 
-        results (dict): Dictionary of objective value, target value min and max value pairs for plotting
+        results (dict): Dictionary of objective value, target value min and max value pairs for plotting. In adaptive mode the keys are the two ends of the range and the exact breakpoints in between
+            When target is a list, a dict of these results dicts keyed by target ID
     Notes:
         - Model is constrained previously (example, set_dm must be run first to simulate DM condition)
         - KeyError if objective reaction input does not exist in model 
+        - ValueError if no target is given
+        - Each point pins the objective reaction at that value on the model itself and solves two LPs, minimize and maximize the target. This gives the same numbers as reading the target row of a full FVA at that point. The objective bounds and the model objective are restored afterwards
+        - With several targets the objective is pinned once per point and each target adds only its own two LPs. In adaptive mode the bisection follows the breakpoints of all targets together, then each target's result keeps only its own breakpoints
         - Use  plot_production_envelope to visualize 
+        - Results are served from the simulation cache when it is enabled and the model has not changed (see sim_cache)
+        - Recorded by sim_trace when tracing is on
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    if target is None:
+        raise ValueError("pe_Data needs a target reaction ID.")
+    targets = [target] if isinstance(target, str) else list(target)
+    session = get_session(model)
+    max_bm = float(session.slim_optimize(objective)) #Identify max objective flux
+    with pinned_objective(session, objective) as pin:
+        def evaluate(b):
+            pin(b)   #constrain objective to specific value
+            values = ()
+            for t in targets:
+                values += target_range(session, t) #minimum and maximum flux through each target at that objective value
+            return values
+        if adaptive:
+            sweep = breakpoint_search(evaluate, 0.0, max_bm, tol=tol, min_width=min_width)
+        else:
+            bm_values = np.linspace(0, max_bm, num_points) #determine set of objective values to be assessed between 0 and max flux
+            sweep = {b: evaluate(b) for b in bm_values}
+    results = {}
+    for i, t in enumerate(targets):
+        results[t] = {b: values[2 * i:2 * i + 2] for b, values in sweep.items()}
+        if adaptive:
+            results[t] = _drop_collinear(results[t], tol)
+    return results[target] if isinstance(target, str) else results
+
+def breakpoint_search(evaluate, x0, x1, tol=1e-6, min_width=None):
+    """
+    Finds the breakpoints of a piecewise-linear envelope by bisecting only the intervals where the slope changes.
+
+    Args:
+        evaluate (function): maps an objective value to a tuple of target values, e.g. (target min, target max), or several such pairs back to back
+        x0, x1 (float): objective range to search
+        tol (float): relative tolerance for calling three points collinear
+        min_width (float): intervals narrower than this are not bisected further. Default is 1/1000 of the range
+    Returns:
+        points (dict): objective value -> evaluate(value) for x0, x1 and every breakpoint found
+    Notes:
+        - The maximum of an LP target over a pinned objective is concave in the objective value and the minimum is convex, so if the midpoint of an interval lies on the chord for every curve the whole interval is linear and needs no more solves
+        - A bending interval that reaches min_width holds a kink. Its exact location is the intersection of the linear pieces on either side, which is then solved directly
+        - Points that turn out to be collinear with their neighbours are dropped, so every interior key is a real slope change
+    """
+    if min_width is None:
+        min_width = (x1 - x0) * 1e-3
+    points = {x0: evaluate(x0), x1: evaluate(x1)}
+    if x1 <= x0:
+        return points
+    stack = [(x0, x1)]
+    unresolved = []
+    while stack:
+        a, b = stack.pop()
+        m = (a + b) / 2
+        points[m] = evaluate(m)
+        if _collinear(points, a, m, b, tol):
+            continue
+        if b - a <= min_width:
+            unresolved.append((a, b))
+            continue
+        stack.extend([(m, b), (a, m)])
+    xs = sorted(points)
+    for a, b in unresolved:
+        i, j = xs.index(a), xs.index(b)
+        if i == 0 or j == len(xs) - 1:
+            continue
+        for k in range(len(points[a])):
+            x = _line_intersection((xs[i - 1], points[xs[i - 1]][k]), (a, points[a][k]),
+                                   (b, points[b][k]), (xs[j + 1], points[xs[j + 1]][k]))
+            if x is not None and a < x < b and x not in points:
+                points[x] = evaluate(x)
+    return _drop_collinear(points, tol)
+
+def envelope_breakpoints(results, tol=1e-6):
+    """
+    Returns the objective values where the slope of the min or max curve changes in a pe_Data results dict.
+    """
+    return sorted(_drop_collinear(results, tol))[1:-1]
+
+def envelope_phases(results, tol=1e-6):
+    """
+    Returns the linear phases of a pe_Data results dict as a list of (start, end) objective value pairs.
+    """
+    xs = sorted(_drop_collinear(results, tol))
+    return list(zip(xs[:-1], xs[1:]))
+
+def _collinear(points, a, x, b, tol):
+    #True if every value at x (min and max of each target) lies on its chord between a and b
+    for k in range(len(points[a])):
+        fa, fx, fb = points[a][k], points[x][k], points[b][k]
+        chord = fa + (fb - fa) * (x - a) / (b - a)
+        if not abs(fx - chord) <= tol * max(1.0, abs(fa), abs(fb)):
+            return False
+    return True
+
+def _line_intersection(p1, p2, p3, p4):
+    #x where the line through p1, p2 meets the line through p3, p4
+    s1 = (p2[1] - p1[1]) / (p2[0] - p1[0])
+    s2 = (p4[1] - p3[1]) / (p4[0] - p3[0])
+    if s1 == s2:
+        return None
+    return (p3[1] - p1[1] + s1 * p1[0] - s2 * p3[0]) / (s1 - s2)
+
+def _drop_collinear(points, tol):
+    xs = sorted(points)
+    keep = [xs[0]]
+    for i in range(1, len(xs) - 1):
+        if not _collinear(points, keep[-1], xs[i], xs[i + 1], tol):
+            keep.append(xs[i])
+    keep.append(xs[-1])
+    return {x: points[x] for x in keep}
+
+@contextmanager
+def pinned_objective(session, objective):
+    """
+    Pins the objective reaction of a session to single values. Yields a function that sets the objective reaction bounds to (value, value); the original bounds and the session objective are restored on exit.
+    """
+    rxn = session.model.reactions.get_by_id(objective)
+    bounds = rxn.bounds
+    def pin(value):
+        rxn.bounds = value, value
+    try:
+        yield pin
+    finally:
+        rxn.bounds = bounds
+        session.set_objective(objective)
+
+def target_range(session, target):
+    """
+    Returns (minimum, maximum) flux through target under the current bounds, solved as two LPs on the session model. NaN if infeasible.
+    """
+    target_min = session.slim_optimize(target, direction='min')
+    target_max = session.slim_optimize(target, direction='max')
+    return target_min, target_max
+
+@traced
+def phase_minMax_sim(model, min_BM_val, max_BM_val, biomass_rxn, objective_rxn, lac_check=0):
+    """
+    Runs FBA on a model reduced to the reactions that can carry flux within one phase (biomass range) of a production envelope, to read shadow prices and reduced costs for that phase
+
+    Args:
+        model (Cobra model): CB model to run simulation on, media-constrained
+        min_BM_val, max_BM_val (float): biomass range of the phase
+        biomass_rxn (str): biomass reaction locked to the range
+        objective_rxn (str): objective of the FBA on the reduced model, e.g. 'IAA_I3A'
+        lac_check (int): if 1, close LDH_L on the model when it can still carry flux
+    Returns:
+        shadow_prices (pandas.core.series.Series), reduced_costs (pandas.core.series.Series): from the FBA solution of the reduced model
+    Notes:
+        - The biomass bounds are set on the model passed in, run it inside `with model:` to undo them
+        - Reactions whose FVA minimum and maximum are both <= 1e-6 are removed from a copy of the model, with their orphaned metabolites
         - Cobrapy Version: 0.29.1, Python Version: 3.9.12
     """
-    base_fba = fba(model, objective=objective) #Identify max objective flux
-    max_bm = float(base_fba.objective_value) 
-    bm_values = np.linspace(0, max_bm, num_points) #determine set of objective values to be assessed between 0 and max flux
     results={}
-    for b in bm_values:
-        mcopy = model.copy()
-        mcopy.reactions.get_by_id(objective).bounds = b,b   #constrain objective to specific value
-        sol= flux_variability_analysis(mcopy, processes=1)
-        target_min=sol.loc[target, 'minimum'] #extract minimum and maximum flux through target at that objective value
-        target_max=sol.loc[target, 'maximum']
-        results[b]= target_min, target_max 
+    model.reactions.get_by_id(biomass_rxn).bounds= min_BM_val, max_BM_val
+    x=fva(model)
+    with span('model.copy'):
+        reduced_model=model.copy()
+    to_remove=[]
+    for rxn, results in x.iterrows():
+        if results[0]<=1e-6 and results[1]<=1e-6:  
+            to_remove.append(rxn)
+    if lac_check == 1:
+        if "LDH_L" not in to_remove: 
+            print("lactate had non zero FVA flux")
+            model.reactions.LDH_L.bounds=0,0
+        else:
+            print("lactate removed in FVA step") 
+    to_remove = [reduced_model.reactions.get_by_id(rxn_id) for rxn_id in to_remove]
+    with span('remove_reactions', n_removed=len(to_remove)):
+        reduced_model.remove_reactions(to_remove, remove_orphans=True) 
+    y=fba(reduced_model, objective=objective_rxn)
+    return y.shadow_prices, y.reduced_costs
 
 def plot_production_envelope_dual(results1, results2, label1, label2, save_dir,title, xlab,ylab,filename):
     """
@@ -44,7 +215,7 @@ def plot_production_envelope_dual(results1, results2, label1, label2, save_dir,t
         filename (str): base name of the desired output file of figure. No extension
 
     Returns: 
-        Figure as svg named as filename at save_dir
+        Figure as svg named as filename at save_dir (IGR632_FIGURE_FORMAT / IGR632_FIGURE_DIR override, see figure_render)
     Notes:
         - Model is constrained previously (example, set_dm must be run first to simulate DM condition)
         - Must run pe_Data prior to running this
@@ -52,17 +223,7 @@ def plot_production_envelope_dual(results1, results2, label1, label2, save_dir,t
         - Only used on comparing two conditions 
         - Cobrapy Version: 0.29.1, Python Version: 3.9.12
     """
-    os.makedirs(save_dir, exist_ok=True)
-
-    plt.rcParams.update({
-        "font.family": "Helvetica",
-        "axes.linewidth": 1.2,
-        "axes.edgecolor": "gray",
-        "grid.color": "lightgray",
-        "grid.linestyle": "--",
-        "grid.linewidth": 0.8,
-        "legend.frameon": False,
-    })
+    apply_style()
 
     plt.figure(figsize=(8, 6))
 
@@ -86,25 +247,13 @@ def plot_production_envelope_dual(results1, results2, label1, label2, save_dir,t
     plt.grid(alpha=0.3)
     plt.legend(fontsize=10)
     plt.tight_layout()
-    filename= str(filename + ".svg")
-    plt.savefig(filename, format='svg') 
-    plt.show()
-    plt.close()
+    save_figure(filename + ".svg", save_dir)
 
 def plot_production_envelope_single(results1, label1, save_dir,title, xlab,ylab,filename, color_pick):
     """
+    Plot a single production envelope of one condition. Same arguments as plot_production_envelope_dual, color_pick (str) is the line color.
     """
-    os.makedirs(save_dir, exist_ok=True)
-
-    plt.rcParams.update({
-        "font.family": "Helvetica",
-        "axes.linewidth": 1.2,
-        "axes.edgecolor": "gray",
-        "grid.color": "lightgray",
-        "grid.linestyle": "--",
-        "grid.linewidth": 0.8,
-        "legend.frameon": False,
-    })
+    apply_style()
 
     plt.figure(figsize=(8, 6))
 
@@ -120,7 +269,4 @@ def plot_production_envelope_single(results1, label1, save_dir,title, xlab,ylab,
     plt.grid(alpha=0.3)
     plt.legend(fontsize=10)
     plt.tight_layout()
-    filename= str(filename + ".svg")
-    plt.savefig(filename, format='svg') 
-    plt.show()
-    plt.close()
+    save_figure(filename + ".svg", save_dir)
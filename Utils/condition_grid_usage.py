@@ -0,0 +1,83 @@
+import cobra
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from set_dms import applied_medium
+from pe_utils import pe_Data
+
+#Model loaded once in each worker process by _load_worker_model, conditions are run against it and undone afterwards
+_worker_model = None
+
+def _load_worker_model(model_path):
+    global _worker_model
+    _worker_model = cobra.io.read_sbml_model(model_path)
+
+def _run_in_worker(condition):
+    return condition['name'], run_condition(_worker_model, condition)
+
+def run_condition(model, condition):
+    """
+    Runs one condition of a grid on a model and undoes every change it made before returning.
+
+    Args:
+        model (Cobra model): base CB model, unconstrained
+        condition (dict): condition description with keys
+            name (str or tuple): label the result is returned under, e.g. (medium, booster)
+            medium (str): medium name accepted by set_dm
+            target (str or list): target reaction ID(s) passed to pe_Data
+            sinks (dict, optional): metabolite ID -> lower bound of a sink added for it, e.g. {'rib_D_c': -2.5}
+            bounds (dict, optional): reaction ID -> (lower bound, upper bound) set after the medium. None keeps that bound as is
+            objective (str, optional): objective reaction, default 'curated_biomass'
+            num_points, adaptive (optional): passed to pe_Data
+    Returns:
+        results (dict): pe_Data output for the condition
+    Notes:
+        - The medium is applied with applied_medium and sinks and bounds are set inside `with model:`, so the model is back to its starting state afterwards
+        - KeyError if a sink metabolite or bound reaction does not exist in model
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    with applied_medium(model, condition['medium']) as (media_model, media):
+        with media_model:
+            for met_id, lb in condition.get('sinks', {}).items():
+                sink = media_model.add_boundary(media_model.metabolites.get_by_id(met_id), type="sink")
+                sink.lower_bound = lb
+            for rxn_id, (lb, ub) in condition.get('bounds', {}).items():
+                rxn = media_model.reactions.get_by_id(rxn_id)
+                rxn.bounds = (rxn.lower_bound if lb is None else lb, rxn.upper_bound if ub is None else ub)
+            return pe_Data(media_model,
+                           objective=condition.get('objective', 'curated_biomass'),
+                           target=condition['target'],
+                           num_points=condition.get('num_points', 10),
+                           adaptive=condition.get('adaptive', False))
+
+def condition_grid(model_path, conditions, processes=None):
+    """
+    Runs a grid of conditions (media x supplements x targets) across worker processes and yields each result as soon as it finishes.
+
+    Args:
+        model_path (str): path to the SBML model. Each worker reads it once at start-up
+        conditions (list): condition dicts as described in run_condition. Names must be unique
+        processes (int): number of worker processes. Default None uses all cores, 1 runs everything in this process
+    Yields:
+        name (str or tuple), results (dict): condition name and its pe_Data output, in order of completion
+    Notes:
+        - Only the condition dicts are sent to the workers and only the pe_Data dicts come back, the model is never pickled
+        - Each worker keeps its model (and its warm-started FBASession) for all the conditions it runs
+        - Scripts that call this must put the call under `if __name__ == "__main__":`, worker processes re-import the calling script on macOS and Windows
+        - example:
+            for name, results in condition_grid('iGR632_v37.xml', conditions):
+                overall_Results[name] = results
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    names = [condition['name'] for condition in conditions]
+    if len(set(names)) != len(names):
+        raise ValueError("Condition names in a grid must be unique.")
+    model_path = os.path.abspath(model_path)
+    if processes == 1:
+        _load_worker_model(model_path)
+        for condition in conditions:
+            yield _run_in_worker(condition)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=_load_worker_model, initargs=(model_path,)) as pool:
+        futures = [pool.submit(_run_in_worker, condition) for condition in conditions]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+#Workbook sheets are parsed once with openpyxl and kept as Feather (Arrow IPC) files that are memory-mapped on later reads
+#   The cache lives in .xlsx_cache next to the workbook unless IGR632_DATA_CACHE points elsewhere
+#   Each cached sheet has a .json sidecar with the workbook's mtime, size and sha256: same mtime and size -> cache used without reading the workbook,
+#   otherwise the workbook is hashed and only re-parsed if the content changed (a copied or re-saved but unchanged file keeps its cache)
+
+def _cache_paths(path, sheet_name, read_kwargs, cache_dir):
+    if cache_dir is None:
+        cache_dir = os.environ.get('IGR632_DATA_CACHE') or os.path.join(os.path.dirname(path), '.xlsx_cache')
+    key = hashlib.sha256(repr((path, sheet_name, sorted(read_kwargs.items()))).encode()).hexdigest()[:16]
+    stem = f"{os.path.splitext(os.path.basename(path))[0]}.{sheet_name}.{key}"
+    return os.path.join(cache_dir, stem + ".feather"), os.path.join(cache_dir, stem + ".json")
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _json_name(name):
+    #Column and index names are kept as-is when JSON can represent them. Tuples (MultiIndex headers) and timestamps (date headers) are tagged so _from_json_name restores them, anything else is kept as its string form
+    if name is None or isinstance(name, (str, int, float, bool)):
+        return name
+    if isinstance(name, tuple):
+        return {'tuple': [_json_name(n) for n in name]}
+    if isinstance(name, (pd.Timestamp, datetime.date)):
+        return {'timestamp': pd.Timestamp(name).isoformat()}
+    if isinstance(name, np.generic):    #numpy scalars, e.g. int64 headers
+        return _json_name(name.item())
+    return str(name)
+
+def _from_json_name(name):
+    if isinstance(name, dict):
+        if 'tuple' in name:
+            return tuple(_from_json_name(n) for n in name['tuple'])
+        return pd.Timestamp(name['timestamp'])
+    return name
+
+def _write_cache(df, data_path, meta_path, meta):
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    range_index = isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1 and df.index.name is None
+    meta = dict(meta, range_index=range_index, index_names=[_json_name(n) for n in df.index.names],
+                columns=[_json_name(c) for c in df.columns], column_names=[_json_name(n) for n in df.columns.names])
+    flat = df.reset_index()
+    n_index = flat.shape[1] - df.shape[1]
+    flat.columns = [f"__index_{i}__" for i in range(n_index)] + [f"__col_{i}__" for i in range(df.shape[1])]
+    tmp = f"{data_path}.{os.getpid()}.tmp"
+    meta_tmp = f"{meta_path}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(pa.Table.from_pandas(flat, preserve_index=False), tmp, compression='uncompressed')    #uncompressed so reads can be memory-mapped
+        os.replace(tmp, data_path)
+        with open(meta_tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_tmp, meta_path)
+    finally:
+        for leftover in (tmp, meta_tmp):    #only left behind when a write failed (e.g. ArrowInvalid)
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+def _read_cache(data_path, meta):
+    flat = feather.read_table(data_path, memory_map=True).to_pandas()
+    n_index = len(meta['index_names'])
+    if meta['range_index']:
+        df = flat.drop(columns='__index_0__')
+    else:
+        df = flat.set_index(list(flat.columns[:n_index]))
+        df.index.names = [_from_json_name(n) for n in meta['index_names']]
+    df.columns = [_from_json_name(c) for c in meta['columns']]
+    df.columns.names = [_from_json_name(n) for n in meta.get('column_names', [None] * df.columns.nlevels)]
+    return df
+
+def read_excel_cached(path, sheet_name=0, cache_dir=None, **read_kwargs):
+    """
+    Reads one workbook sheet like pd.read_excel, parsing the .xlsx only when it changed since the last read
+
+    Args:
+        path (str): workbook path
+        sheet_name (str or int): one sheet, by name or position
+        cache_dir (str): where cached sheets are kept. Default .xlsx_cache next to the workbook (or IGR632_DATA_CACHE)
+        read_kwargs: passed to pd.read_excel (e.g. index_col, na_values). Different arguments are cached separately
+    Returns:
+        df (pandas.core.frame.DataFrame): same columns, index and dtypes as pd.read_excel returns
+    Notes:
+        - The cache is checked by workbook mtime and size first, then by sha256 of the workbook, so a touched but unchanged workbook is not re-parsed
+        - Cached sheets are uncompressed Feather files read through a memory map, no openpyxl import or XML parsing on a cache hit
+        - Column and index labels round-trip with their types for str, int, float, bool, None, tuples (MultiIndex headers) and dates. Other label types come back as their string form
+        - Sheets with columns that mix numbers and text cannot be stored as Arrow and are read with pd.read_excel every time
+        - ValueError for sheet_name=None (all sheets), read each sheet by name instead
+    """
+    if sheet_name is None:
+        raise ValueError("read_excel_cached reads one sheet at a time, pass a sheet name or position.")
+    path = os.path.abspath(path)
+    data_path, meta_path = _cache_paths(path, sheet_name, read_kwargs, cache_dir)
+    st = os.stat(path)
+    meta = None
+    if os.path.exists(data_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['mtime_ns'] == st.st_mtime_ns and meta['size'] == st.st_size:
+            return _read_cache(data_path, meta)
+    digest = _file_hash(path)
+    if meta is not None and meta['sha256'] == digest:
+        meta.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        return _read_cache(data_path, meta)
+    df = pd.read_excel(path, sheet_name=sheet_name, **read_kwargs)
+    try:
+        _write_cache(df, data_path, meta_path, {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha256': digest})
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass    #columns mixing types (e.g. numbers and text) have no Arrow type, such sheets are parsed on every read
+    return df
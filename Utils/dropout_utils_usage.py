@@ -0,0 +1,209 @@
+import cobra
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from run_fba import get_session
+from set_dms import applied_medium, check_dm, register_medium
+
+#Model and medium held by each worker process, set once by _init_worker
+_worker = {}
+
+def _init_worker(model, dm, composition, objective):
+    #The composition the parent applied is registered in the worker first: spawned workers start from a fresh registry without the media registered at run time
+    #(register_medium, translated media), and derived media are not derived again in every worker
+    register_medium(dm, composition)
+    _worker['model'] = model
+    _worker['objective'] = objective
+    _worker['medium'] = applied_medium(model, dm)
+    _worker['medium'].__enter__()    #medium stays applied for the life of the worker
+
+def _composition(media):
+    #Reaction object -> lower bound, as applied_medium yields it, to the registry form
+    return {rxn.id: lb for rxn, lb in media.items()}
+
+def _drop_chunk(rxn_ids):
+    return _drop_each(_worker['model'], rxn_ids, _worker['objective'])
+
+def _drop_combo_chunk(args):
+    combos, medium_ids, tol = args
+    return _drop_combos(_worker['model'], combos, _worker['objective'], medium_ids, tol)
+
+def _drop_each(model, rxn_ids, objective):
+    #One warm-started slim solve per component: close its uptake, solve, restore
+    session = get_session(model)
+    growth = []
+    for rxn_id in rxn_ids:
+        session.set_bounds(rxn_id, lower_bound=0)
+        growth.append(session.slim_optimize(objective))
+        session.reset(rxn_id)
+    return growth
+
+def _imports(reactions, tol):
+    #IDs of the medium exchanges taken up in the last solution
+    return frozenset(rxn.id for rxn in reactions if rxn.forward_variable.primal - rxn.reverse_variable.primal < -tol)
+
+def _drop_combos(model, combos, objective, medium_ids, tol):
+    #One warm-started slim solve per combination. Returns (growth, components imported at that optimum), imports is None when infeasible
+    session = get_session(model)
+    medium_rxns = [model.reactions.get_by_id(rxn_id) for rxn_id in medium_ids]
+    out = []
+    for combo in combos:
+        for rxn_id in combo:
+            session.set_bounds(rxn_id, lower_bound=0)
+        growth = session.slim_optimize(objective)
+        out.append((growth, None if np.isnan(growth) else _imports(medium_rxns, tol)))
+        for rxn_id in combo:    #only the combination's bounds, bounds the caller set on the session stay
+            session.reset(rxn_id)
+    return out
+
+def fold_change(growth, full_growth, growth_floor=None):
+    """
+    Normalizes dropout growth rates to the full-medium growth rate. When the full-medium growth is below growth_floor, growth_floor is the denominator instead.
+    """
+    denominator = full_growth if growth_floor is None else max(full_growth, growth_floor)
+    return np.asarray(growth, dtype=float) / denominator
+
+def single_dropout(model, dm, objective='curated_biomass', growth_floor=None, processes=1, prefilter=True, tol=1e-9):
+    """
+    Simulates the single-component dropout of every component of a medium and returns growth fold changes
+
+    Args:
+        model (Cobra model): base CB model, the medium is applied and restored by this function
+        dm (str): medium to drop components from, any name accepted by set_dm
+        objective (str): objective reaction, default iGR632 biomass 'curated_biomass'
+        growth_floor (float): minimum denominator for the fold change (e.g. 0.43 for DM57). Default None normalizes to the full-medium growth rate
+        processes (int): number of worker processes. Default 1 runs in this process, None uses cobra.Configuration().processes
+        prefilter (bool): if True, components that are not taken up in the full-medium optimum are called neutral without a solve
+        tol (float): exchange flux above -tol counts as not taken up
+    Returns:
+        is_fc (pandas.core.frame.DataFrame): indexed by 'exchange', columns 'growth' (objective flux with the component removed), 'IS' (fold change) and 'skipped' (True if no LP was solved for it)
+        full_growth (float): objective flux in the full medium
+    Notes:
+        - Each dropout sets the component's exchange lower bound to 0 and runs one slim solve on a warm-started FBASession, then restores the bound
+        - Infeasible dropouts have growth NaN
+        - Pre-filter: closing the uptake of a component the reference optimum does not import leaves that optimum feasible, so growth is exactly the full-medium growth and no solve is needed. Only the imported components are dropped
+        - A medium has a few dozen components and each dropout is a millisecond warm-started solve, so one process is usually fastest: a pool pays for starting workers and pickling the model to each of them. Use processes > 1 for large models or media
+        - With several processes the model and the applied medium composition are sent once to each worker, which applies the medium once and works through a contiguous chunk of components, so every worker keeps warm starts between its solves. Media registered at run time (register_medium, translated media) therefore also work in spawned workers
+        - Scripts that call this with processes > 1 must put the call under `if __name__ == "__main__":`
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    check_dm(dm)
+    if processes is None:
+        processes = cobra.Configuration().processes
+    with applied_medium(model, dm) as (media_model, media):
+        rxn_ids = [rxn.id for rxn in media]
+        reference = get_session(media_model).optimize(objective)
+        full_growth = reference.objective_value
+        if prefilter:
+            skipped = (reference.fluxes[rxn_ids] >= -tol).to_numpy()
+        else:
+            skipped = np.zeros(len(rxn_ids), dtype=bool)
+        to_solve = [rxn_id for rxn_id, skip in zip(rxn_ids, skipped) if not skip]
+        growth = np.full(len(rxn_ids), full_growth, dtype=float)
+        processes = max(1, min(processes, len(to_solve)))
+        if processes == 1:
+            solved = _drop_each(media_model, to_solve, objective)
+        else:
+            chunks = [chunk.tolist() for chunk in np.array_split(np.array(to_solve, dtype=object), processes)]
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(model, dm, _composition(media), objective)) as pool:
+                solved = [g for chunk in pool.map(_drop_chunk, chunks) for g in chunk]
+        growth[~skipped] = solved
+    is_fc = pd.DataFrame({'growth': growth, 'IS': fold_change(growth, full_growth, growth_floor), 'skipped': skipped},
+                         index=pd.Index(rxn_ids, name='exchange'))
+    return is_fc, full_growth
+
+def multi_dropout(model, dm, max_order=2, objective='curated_biomass', growth_floor=None, processes=None, lethal=1e-6, tol=1e-9):
+    """
+    Simulates every combination of up to max_order components dropped together from a medium (pairs, triples), solving only the combinations that pruning cannot decide
+
+    Args:
+        model (Cobra model): base CB model, the medium is applied and restored by this function
+        dm (str): medium to drop components from, any name accepted by set_dm
+        max_order (int): largest number of components dropped together, 2 for pairs, 3 for triples
+        objective (str): objective reaction, default iGR632 biomass 'curated_biomass'
+        growth_floor (float): minimum denominator for the fold change, as in single_dropout
+        processes (int): number of worker processes. Default None uses cobra.Configuration().processes, 1 runs in this process
+        lethal (float): growth below this (or infeasible) counts as lethal
+        tol (float): exchange flux above -tol counts as not taken up
+    Returns:
+        dropouts (pandas.core.frame.DataFrame): one row per combination, columns 'order', 'exchanges' (tuple of exchange IDs), 'growth', 'IS' (fold change) and 'status'
+            'solved': an LP was solved
+            'lethal': contains a lethal smaller combination, growth 0 without a solve
+            'inherited': the optimum of a combination one smaller does not take up the added component, so it stays optimal. Growth copied without a solve (this includes the single-dropout flux pre-filter)
+        full_growth (float): objective flux in the full medium
+    Notes:
+        - Closing uptakes only removes feasible flux states, so growth never rises when more is dropped. That is what makes both pruning rules exact
+        - Each solved optimum records which medium components it takes up, so the inherited rule is applied at every order, not only against the full medium
+        - Worker processes keep the medium applied and a warm FBASession for all the combinations they solve, as in single_dropout
+        - Use epistasis_matrix on the result for the pairwise interaction matrix
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    check_dm(dm)
+    if processes is None:
+        processes = cobra.Configuration().processes
+    pool = None
+    with applied_medium(model, dm) as (media_model, media):
+        rxn_ids = [rxn.id for rxn in media]
+        session = get_session(media_model)
+        full_growth = session.slim_optimize(objective)
+        medium_rxns = [media_model.reactions.get_by_id(rxn_id) for rxn_id in rxn_ids]
+        known = {(): (full_growth, _imports(medium_rxns, tol), 'solved')}
+        try:
+            for order in range(1, max_order + 1):
+                to_solve = []
+                for combo in itertools.combinations(rxn_ids, order):
+                    decided = None
+                    for i, added in enumerate(combo):
+                        growth, imports, status = known[combo[:i] + combo[i + 1:]]
+                        if imports is None or growth < lethal:
+                            decided = (0.0, None, 'lethal')
+                            break
+                        if decided is None and added not in imports:
+                            decided = (growth, imports, 'inherited')
+                    if decided is None:
+                        to_solve.append(combo)
+                    else:
+                        known[combo] = decided
+                if processes > 1 and len(to_solve) > 1 and pool is None:
+                    pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(model, dm, _composition(media), objective))
+                if pool is None:
+                    solved = _drop_combos(media_model, to_solve, objective, rxn_ids, tol)
+                else:
+                    size = -(-len(to_solve) // (processes * 4))    #a few chunks per worker for load balancing, contiguous for warm starts
+                    chunks = [to_solve[i:i + size] for i in range(0, len(to_solve), size)]
+                    solved = [r for chunk in pool.map(_drop_combo_chunk, [(c, rxn_ids, tol) for c in chunks]) for r in chunk]
+                for combo, (growth, imports) in zip(to_solve, solved):
+                    known[combo] = (growth, imports, 'solved')
+        finally:
+            if pool is not None:
+                pool.shutdown()
+    del known[()]
+    position = {rxn_id: i for i, rxn_id in enumerate(rxn_ids)}
+    combos = sorted(known, key=lambda combo: (len(combo), [position[rxn_id] for rxn_id in combo]))
+    rows = [(len(combo), combo, known[combo][0], known[combo][2]) for combo in combos]
+    dropouts = pd.DataFrame(rows, columns=['order', 'exchanges', 'growth', 'status'])
+    dropouts.insert(3, 'IS', fold_change(dropouts['growth'].to_numpy(), full_growth, growth_floor))
+    return dropouts, full_growth
+
+def epistasis_matrix(dropouts):
+    """
+    Builds the pairwise interaction matrix from multi_dropout output: epsilon_ab = W_ab - W_a * W_b, with W the fold change IS
+
+    Args:
+        dropouts (pandas.core.frame.DataFrame): multi_dropout result with max_order >= 2
+    Returns:
+        epsilon (pandas.core.frame.DataFrame): symmetric exchange x exchange matrix, NaN on the diagonal. Negative values are aggravating (the pair hurts more than expected), positive values buffering
+    """
+    singles = dropouts[dropouts['order'] == 1]
+    w = pd.Series(singles['IS'].to_numpy(), index=[combo[0] for combo in singles['exchanges']])
+    pairs = dropouts[dropouts['order'] == 2]
+    index = w.index
+    position = {rxn_id: i for i, rxn_id in enumerate(index)}
+    w_pair = np.full((len(index), len(index)), np.nan)
+    a = np.array([position[combo[0]] for combo in pairs['exchanges']], dtype=int)
+    b = np.array([position[combo[1]] for combo in pairs['exchanges']], dtype=int)
+    w_pair[a, b] = pairs['IS'].to_numpy()
+    w_pair[b, a] = pairs['IS'].to_numpy()
+    w_values = w.to_numpy()
+    return pd.DataFrame(w_pair - np.outer(w_values, w_values), index=index, columns=index)
@@ -0,0 +1,131 @@
+import os
+import re
+import json
+import hashlib
+import cobra
+from set_dms import MEDIA, register_medium
+from model_index import get_index
+
+#Exchange ID translation from the iGR632 namespace (EX_ala_L_e) to the other LGG models in Model/
+#   AGORA1.02: EX_ala_L(e), MERLIN-iCC568: EX_ala__L_e (BiGG)
+#   overrides: IDs the naming rules get wrong, checked first
+#   Tables are cached as JSON in .exchange_map_cache next to the model file, keyed by the model file's mtime and size and by the IDs translated
+NAMESPACES = {
+    'iGR632': {
+        'file': 'iGR632_v37.xml',
+        'objective': 'curated_biomass',
+        'overrides': {},
+    },
+    'AGORA': {
+        'file': 'AGORA1.02-Lactobacillus_rhamnosus_GG_ATCC_53103.xml',
+        'objective': 'biomass205',
+        'overrides': {'EX_NH4_e': 'EX_nh4(e)'},
+    },
+    'MERLIN': {
+        'file': 'MERLIN-iCC568.xml',
+        'objective': 'e_Biomass',
+        'overrides': {'EX_glc_D_e': 'EX_glc__aD_e'},
+    },
+}
+
+#iGR632 media whose components are translated by default (registered translations are not sources themselves)
+SOURCE_MEDIA = ['57', '25', '16', '13', 'sun']
+
+def _source_ids():
+    return sorted({rxn_id for medium in SOURCE_MEDIA for rxn_id in MEDIA[medium]})
+
+def translate_id(rxn_id, namespace):
+    """
+    Maps an iGR632 exchange ID to the AGORA (EX_ala_L(e)) or MERLIN (EX_ala__L_e) naming convention by rule, without checking the model.
+    """
+    override = NAMESPACES[namespace]['overrides'].get(rxn_id)
+    if override is not None:
+        return override
+    if namespace == 'iGR632':
+        return rxn_id
+    if namespace == 'AGORA':
+        return re.sub(r'_e$', '(e)', rxn_id)
+    return re.sub(r'_([LDR])_e$', r'__\1_e', rxn_id)
+
+def _exchange_key(rxn_id):
+    #Namespace-free form of an exchange ID: EX_NH4_e, EX_nh4(e), EX_ala__L_e -> nh4, nh4, ala_l
+    key = rxn_id.lower()
+    key = re.sub(r'^ex_', '', key)
+    key = re.sub(r'(\(e\)|\[e\]|_e)$', '', key)
+    return key.replace('__', '_')
+
+def build_exchange_table(model, namespace, rxn_ids=None):
+    """
+    Translates iGR632 exchange IDs to the exchange IDs of a model
+
+    Args:
+        model (Cobra model): model in the target namespace
+        namespace (str): 'iGR632', 'AGORA' or 'MERLIN'
+        rxn_ids (list): iGR632 exchange IDs to translate. Default is every component of the SOURCE_MEDIA
+    Returns:
+        table (dict): iGR632 ID -> model reaction ID, None where the model has no matching exchange
+    Notes:
+        - The override and naming rule are tried first, then a case-insensitive match of the metabolite part of the ID against the model's exchanges (e.g. EX_NH4_e -> EX_nh4(e))
+    """
+    if rxn_ids is None:
+        rxn_ids = _source_ids()
+    by_key = {}
+    for i in get_index(model).positions('exchange').tolist():
+        rxn_id = model.reactions[i].id
+        by_key.setdefault(_exchange_key(rxn_id), rxn_id)
+    table = {}
+    for rxn_id in rxn_ids:
+        mapped = translate_id(rxn_id, namespace)
+        if mapped not in model.reactions:
+            mapped = by_key.get(_exchange_key(rxn_id))
+        table[rxn_id] = mapped
+    return table
+
+def exchange_table(model_path, namespace, model=None, rxn_ids=None):
+    """
+    Cached build_exchange_table for a model file. The model is only read (or the passed model used) when the cached table is missing or stale.
+    """
+    if rxn_ids is None:
+        rxn_ids = _source_ids()
+    model_path = os.path.abspath(model_path)
+    st = os.stat(model_path)
+    ids_hash = hashlib.sha256("\n".join(rxn_ids).encode()).hexdigest()[:16]
+    cache_path = os.path.join(os.path.dirname(model_path), '.exchange_map_cache',
+                              f"{os.path.basename(model_path)}.{namespace}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if (cached['mtime_ns'], cached['size'], cached['ids']) == (st.st_mtime_ns, st.st_size, ids_hash):
+            return cached['table']
+    if model is None:
+        model = cobra.io.read_sbml_model(model_path)
+    table = build_exchange_table(model, namespace, rxn_ids)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'ids': ids_hash, 'table': table}, f, indent=1)
+    os.replace(tmp, cache_path)
+    return table
+
+def register_translated_media(namespace, table, media):
+    """
+    Registers the translated version of iGR632 media for one model
+
+    Args:
+        namespace (str): model namespace, part of the registry name
+        table (dict): translation table from exchange_table
+        media (list): registry names of iGR632 media, e.g. ['57', 'sun']
+    Returns:
+        names (dict): iGR632 medium name -> registry name of the translated medium ('<namespace>_<medium>', the medium itself for iGR632)
+        missing (dict): iGR632 medium name -> components without a matching exchange, left out of the translated medium
+    """
+    names, missing = {}, {}
+    for medium in media:
+        if namespace == 'iGR632':
+            names[medium], missing[medium] = medium, []
+            continue
+        composition = {table[rxn_id]: lb for rxn_id, lb in MEDIA[medium].items() if table.get(rxn_id)}
+        names[medium] = f"{namespace}_{medium}"
+        missing[medium] = [rxn_id for rxn_id in MEDIA[medium] if not table.get(rxn_id)]
+        register_medium(names[medium], composition)
+    return names, missing
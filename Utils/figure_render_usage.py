@@ -0,0 +1,196 @@
+import os
+import sys
+import runpy
+import argparse
+import functools
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+
+#Non-interactive backend when there is no display (headless nodes) or IGR632_HEADLESS is set, so plt.show() returns instead of blocking
+#   IGR632_FIGURE_DIR: directory figures are written to by save_figure and by scripts run through render_scripts
+#   IGR632_FIGURE_FORMAT: 'svg' or 'png', replaces the extension scripts save with
+if os.environ.get('IGR632_HEADLESS') or (sys.platform.startswith('linux') and not os.environ.get('DISPLAY')):
+    matplotlib.use('Agg', force=True)
+import matplotlib.pyplot as plt
+from matplotlib import font_manager
+from matplotlib.figure import Figure
+
+#Shared figure style, previously repeated as rcParams blocks in the plotting functions
+FONT_PREFERENCE = ['Helvetica', 'Arial', 'Liberation Sans', 'DejaVu Sans']
+STYLE = {
+    "axes.linewidth": 1.2,
+    "axes.edgecolor": "gray",
+    "grid.color": "lightgray",
+    "grid.linestyle": "--",
+    "grid.linewidth": 0.8,
+    "legend.frameon": False,
+}
+
+@functools.lru_cache(maxsize=None)
+def resolve_font():
+    """
+    Returns the first family of FONT_PREFERENCE installed on this machine. Looked up once per process, the font search is the slow part of style setup.
+    """
+    for family in FONT_PREFERENCE:
+        try:
+            font_manager.findfont(font_manager.FontProperties(family=family), fallback_to_default=False)
+            return family
+        except ValueError:
+            continue
+    return matplotlib.rcParamsDefault['font.family'][0]
+
+def apply_style():
+    """
+    Sets the shared figure style (STYLE plus the resolved font) on the global rcParams.
+    """
+    plt.rcParams.update(STYLE)
+    plt.rcParams["font.family"] = resolve_font()
+
+def figure_path(filename, save_dir=None, fmt=None):
+    """
+    Resolves where a figure is written: save_dir, else IGR632_FIGURE_DIR, else the working directory. fmt (or IGR632_FIGURE_FORMAT) replaces the file extension.
+    """
+    save_dir = save_dir or os.environ.get('IGR632_FIGURE_DIR') or os.getcwd()
+    fmt = fmt or os.environ.get('IGR632_FIGURE_FORMAT')
+    os.makedirs(save_dir, exist_ok=True)
+    base, ext = os.path.splitext(os.path.basename(filename))
+    return os.path.join(save_dir, base + (f".{fmt}" if fmt else (ext or ".svg")))
+
+NON_INTERACTIVE = ('agg', 'cairo', 'pdf', 'pgf', 'ps', 'svg', 'template')
+
+def is_headless():
+    """
+    True when the active backend cannot open windows, plt.show() would do nothing.
+    """
+    return matplotlib.get_backend().lower() in NON_INTERACTIVE
+
+def save_figure(filename, save_dir=None, fmt=None, fig=None, show=None, **savefig_kwargs):
+    """
+    Saves a figure (default the current one) to figure_path(filename, save_dir, fmt), shows it unless headless (or show=False) and closes it. Returns the path written.
+    """
+    fig = plt.gcf() if fig is None else fig
+    path = figure_path(filename, save_dir, fmt)
+    fig.savefig(path, format=os.path.splitext(path)[1][1:], **savefig_kwargs)
+    if show is None:
+        show = not is_headless()
+    if show:
+        plt.show()
+    plt.close(fig)
+    return path
+
+#Worker side of render_scripts / render_jobs: every savefig is redirected into a subdirectory of the output directory named after the running script or job, and recorded
+_written = []
+_current = {'label': ''}
+_original_savefig = Figure.savefig
+
+def _redirected_savefig(self, fname, *args, **kwargs):
+    if isinstance(fname, (str, os.PathLike)):
+        fname = figure_path(os.fspath(fname), os.path.join(os.environ['IGR632_FIGURE_DIR'], _current['label']))
+        kwargs['format'] = os.path.splitext(fname)[1][1:]
+        _written.append(fname)
+    return _original_savefig(self, fname, *args, **kwargs)
+
+def _init_renderer(output_dir, fmt):
+    os.environ['IGR632_FIGURE_DIR'] = os.path.abspath(output_dir)
+    if fmt:
+        os.environ['IGR632_FIGURE_FORMAT'] = fmt
+    plt.switch_backend('Agg')
+    apply_style()
+    Figure.savefig = _redirected_savefig
+
+def _render_script(script):
+    start = len(_written)
+    cwd = os.getcwd()
+    _current['label'] = os.path.splitext(os.path.basename(script))[0]
+    try:
+        os.chdir(os.path.dirname(os.path.abspath(script)))    #scripts read their data files by relative path
+        runpy.run_path(os.path.abspath(script), run_name='__main__')
+        error = None
+    except SystemExit as e:    #scripts ending in sys.exit(); a nonzero code is a failure
+        error = None if e.code in (None, 0) else traceback.format_exc()
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        os.chdir(cwd)
+        plt.close('all')
+    return script, _written[start:], error
+
+def _render_job(job):
+    name, func, args, kwargs = job
+    start = len(_written)
+    _current['label'] = name
+    try:
+        func(*args, **kwargs)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        plt.close('all')
+    return name, _written[start:], error
+
+def _render(worker, items, output_dir, fmt, processes):
+    output_dir = os.path.abspath(output_dir)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_renderer, initargs=(output_dir, fmt)) as pool:
+        futures = [pool.submit(worker, item) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
+
+def render_scripts(scripts, output_dir, fmt=None, processes=None):
+    """
+    Runs figure scripts concurrently on the Agg backend and collects their figures in one directory
+
+    Args:
+        scripts (list): paths of the figure scripts
+        output_dir (str): directory all figures are written to
+        fmt (str): 'svg' or 'png'. Default None keeps the extension each script saves with
+        processes (int): number of worker processes. Default None uses all cores
+    Yields:
+        script (str), written (list), error (str): the files each script wrote and the traceback if it failed, in order of completion
+    Notes:
+        - Each script runs as __main__ in its own directory, so relative data paths still resolve
+        - Every savefig is redirected into output_dir/<script name>/ by file name, including absolute paths such as save_dir arguments, so scripts saving the same file name do not overwrite each other. plt.show() does not block
+        - Each worker sets up the style and font once for all the scripts it runs
+        - A failing script does not stop the others, its traceback is returned
+    """
+    return _render(_render_script, scripts, output_dir, fmt, processes)
+
+def render_jobs(jobs, output_dir, fmt=None, processes=None):
+    """
+    Same as render_scripts for plotting functions: jobs are (name, function, args, kwargs) tuples, figures go to output_dir/<name>/. Functions and arguments must be picklable (module-level functions and plain data such as pe_Data results).
+    """
+    return _render(_render_job, jobs, output_dir, fmt, processes)
+
+#Figure scripts of the repository, relative to its root
+FIGURE_SCRIPTS = [
+    'Validation/IS_Validation/model_performance_heatmap.py',
+    'Validation/IS_Validation/generate_individualCMs.py',
+    'Validation/IS_Validation/IV_v_IS_growth_rates.py',
+    'Validation/IS_Validation/GMM_threshold.py',
+    'Validation/IV_DOs/All_DO_rates.py',
+    'Validation/IV_DOs/DO_heatmap_generated.py',
+    'Validation/IV_DOs/combined_DO_fullmediaControls.py',
+    'Model_Applications/Minimal_Media/arg_iso_DM7_curves.py',
+    'Model_Applications/Alternative_Carbon/AAcarbon_stats_figure.py',
+    'Model/memote_BarChart.py',
+    'Model/generate_waffle.py',
+    'Metabolites/iGR632_MetsByMedia_PEs.py',
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render figure scripts headless and in parallel")
+    parser.add_argument('scripts', nargs='*', help="scripts to render, default FIGURE_SCRIPTS under --root")
+    parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    parser.add_argument('--out', default='figures')
+    parser.add_argument('--format', choices=['svg', 'png'], default=None)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+    scripts = args.scripts or [os.path.join(args.root, s) for s in FIGURE_SCRIPTS]
+    failed = 0
+    for script, written, error in render_scripts(scripts, args.out, args.format, args.processes):
+        if error:
+            failed += 1
+            print(f"FAILED {script}\n{error}")
+        else:
+            print(f"{script}: {', '.join(written) or 'no figures'}")
+    sys.exit(1 if failed else 0)
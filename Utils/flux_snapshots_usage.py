@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+from optlang.symbolics import Zero
+from run_fba import get_session
+from sim_cache import cached
+from sim_trace import traced
+
+class FluxSnapshots:
+    """
+    Flux distributions of one model at several conditions, stored as a single reactions x conditions float64 array.
+
+    Args:
+        reactions (list): reaction IDs, the row labels shared by all conditions
+        conditions (numpy.ndarray): condition values (e.g. objective upper bounds), one per column
+        fluxes (numpy.ndarray): (len(reactions), len(conditions)) net fluxes, NaN columns for conditions that were not optimal
+        objective_values (numpy.ndarray): objective flux at each condition
+        objective (str): reaction the conditions constrain
+    Notes:
+        - snapshots[value] returns the flux Series of one condition, like the solution.fluxes the dict of get_flux_results used to hold
+        - to_frame() gives the whole matrix as a DataFrame (reactions x conditions)
+    """
+    def __init__(self, reactions, conditions, fluxes, objective_values, objective):
+        self.reactions = list(reactions)
+        self.conditions = np.asarray(conditions, dtype=float)
+        self.fluxes = fluxes
+        self.objective_values = np.asarray(objective_values, dtype=float)
+        self.objective = objective
+        self._column = {c: i for i, c in enumerate(self.conditions.tolist())}
+        self._index = pd.Index(self.reactions, name='reaction')
+
+    def __len__(self):
+        return len(self.conditions)
+
+    def __getitem__(self, condition):
+        return pd.Series(self.fluxes[:, self._column[float(condition)]], index=self._index, name=condition)
+
+    def row(self, rxn_id):
+        """
+        Returns the fluxes of one reaction across all conditions.
+        """
+        return self.fluxes[self.reactions.index(rxn_id)]
+
+    def to_frame(self):
+        return pd.DataFrame(self.fluxes, index=self._index, columns=self.conditions)
+
+    def active_reactions(self):
+        """
+        Returns the IDs of the reactions with a nonzero flux at any condition (NaN columns ignored). sim_cache records these as the active set of the result.
+        """
+        carrying = np.flatnonzero(np.any(np.nan_to_num(self.fluxes) != 0, axis=1))
+        return {self.reactions[i] for i in carrying.tolist()}
+
+def _net_fluxes(model, forward, reverse):
+    #Net flux of every reaction from the primal values of the last solve, without building a cobra Solution
+    primal = model.solver.primal_values
+    return np.fromiter((primal[f] - primal[r] for f, r in zip(forward, reverse)), dtype=float, count=len(forward))
+
+def _l1_objective(session):
+    #Minimize the sum of the forward and reverse variables of every reaction (total flux), the pFBA objective. Installed through the session so it keeps track of the objective
+    model = session.model
+    objective = model.problem.Objective(Zero, direction='min', sloppy=True)
+    session.set_solver_objective(objective)
+    objective.set_linear_coefficients({v: 1.0 for rxn in model.reactions for v in (rxn.forward_variable, rxn.reverse_variable)})
+    return objective
+
+@traced
+@cached
+def flux_snapshots(model, values, objective='curated_biomass', parsimonious=False, fraction_of_optimum=1.0):
+    """
+    Solves FBA at a series of objective upper bounds on one model and collects the flux distributions in one array
+
+    Args:
+        model (Cobra model): CB model to run simulations on, media-constrained beforehand (e.g. with applied_medium)
+        values (list): upper bounds put on the objective reaction, e.g. the biomass values of envelope breakpoints
+        objective (str): objective reaction, maximized at every value. Default is iGR632 LGG model biomass function 'curated_biomass'
+        parsimonious (bool): True gives the minimal total flux (pFBA) distribution at each value instead of an arbitrary FBA optimum. Default False
+        fraction_of_optimum (float): parsimonious mode only, fraction of the objective optimum the objective is pinned to. Default 1.0
+    Returns:
+        snapshots (FluxSnapshots): reactions x values flux matrix, columns in the order of values
+    Notes:
+        - Same constraints as the model.copy() loop it replaces: objective bounds (0, value), objective maximized, so each column is an FBA solution with the objective at min(value, max)
+        - The bounds are changed in place on the model's FBASession and restored afterwards. No model copies, one LP per value, warm started from the previous value (values are solved in increasing order)
+        - Parsimonious mode solves the objective maximum once, at the largest value, since the optimum at every value is min(value, max). Each value then pins the objective with its bounds (fraction_of_optimum * optimum, value) and minimizes total flux on the same LP: the L1 objective is set once and only the pinned bounds change between solves
+        - FBA optima are not unique, so plain snapshots can differ between values in reactions that have nothing to do with the change in objective. pFBA distributions are unique up to ties in total flux, which makes compare_snapshots differences meaningful without an FVA check
+        - Fluxes are read straight from the solver's primal values into the array, no cobra Solution objects are built
+        - Infeasible values give NaN columns, an empty values list gives an empty matrix
+        - Results are served from the simulation cache when it is enabled and the model has not changed (see sim_cache)
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    values = np.asarray(values, dtype=float)
+    reactions = model.reactions
+    if len(values) == 0:    #e.g. a medium without slope changes, nothing to solve and no bounds to restore
+        return FluxSnapshots([rxn.id for rxn in reactions], values, np.empty((len(reactions), 0)), values, objective)
+    forward = [rxn.forward_variable.name for rxn in reactions]
+    reverse = [rxn.reverse_variable.name for rxn in reactions]
+    fluxes = np.full((len(reactions), len(values)), np.nan)
+    objective_values = np.full(len(values), np.nan)
+    session = get_session(model)
+    try:
+        if not parsimonious:
+            for j in np.argsort(values, kind='stable'):
+                session.set_bounds(objective, lower_bound=0, upper_bound=values[j])
+                growth = session.slim_optimize(objective)
+                if np.isnan(growth):
+                    continue
+                objective_values[j] = growth
+                fluxes[:, j] = _net_fluxes(model, forward, reverse)
+        else:
+            session.set_bounds(objective, lower_bound=0, upper_bound=values.max())
+            optimum = session.slim_optimize(objective)
+            if not np.isnan(optimum):
+                _l1_objective(session)
+                position = [rxn.id for rxn in reactions].index(objective)
+                for j in np.argsort(values, kind='stable'):
+                    growth = min(values[j], optimum)
+                    session.set_bounds(objective, lower_bound=fraction_of_optimum * growth, upper_bound=values[j])
+                    if np.isnan(session.slim_optimize(direction='min')):
+                        continue
+                    fluxes[:, j] = _net_fluxes(model, forward, reverse)
+                    objective_values[j] = fluxes[position, j]
+    finally:
+        session.reset(objective)
+        if parsimonious:
+            session.set_objective(objective)
+    return FluxSnapshots([rxn.id for rxn in reactions], values, fluxes, objective_values, objective)
+
+def exclusion_mask(reactions, exclude_exact=None, exclude_prefix=None):
+    """
+    Boolean array over reaction IDs, True for IDs listed in exclude_exact or starting with one of exclude_prefix. compare_snapshots builds it once for all pairs.
+    """
+    exact = set(exclude_exact or [])
+    prefixes = tuple(exclude_prefix or [])
+    return np.fromiter((rxn_id in exact or (bool(prefixes) and rxn_id.startswith(prefixes)) for rxn_id in reactions),
+                       dtype=bool, count=len(reactions))
+
+def compare_snapshots(snapshots, pairs=None, abs_tol=1e-6, threshold=None, exclude_exact=None, exclude_prefix=None):
+    """
+    Compares biomass-normalized flux distributions between pairs of conditions of a FluxSnapshots matrix in one array pass
+
+    Args:
+        snapshots (FluxSnapshots): flux matrix from flux_snapshots
+        pairs (list): (value1, value2) condition pairs to compare. Default compares consecutive conditions in increasing order
+        abs_tol (float): differences at or below this are not changes
+        threshold (float): minimum absolute difference kept (e.g. 0.05), applied together with abs_tol. Default None keeps everything above abs_tol
+        exclude_exact (list): reaction IDs left out, e.g. ['curated_biomass']
+        exclude_prefix (list): reaction ID prefixes left out, e.g. ['e_', 'DM_']
+    Returns:
+        changes (pandas.core.frame.DataFrame): tidy table, one row per changed reaction and pair, columns 'val1', 'val2', 'reaction', 'flux1_norm', 'flux2_norm', 'flux_difference'. Sorted by pair (in pairs order), then by absolute difference
+    Notes:
+        - Fluxes are normalized by their condition value (the biomass value), as compare_fluxes did
+        - The exclusions are one boolean mask over the reactions (exclusion_mask), combined with the tolerance mask of all pairs at once
+    """
+    conditions = snapshots.conditions
+    if pairs is None:
+        order = np.argsort(conditions, kind='stable')
+        pairs = list(zip(conditions[order[:-1]].tolist(), conditions[order[1:]].tolist()))
+    column = {c: j for j, c in enumerate(conditions.tolist())}
+    first = np.array([column[float(a)] for a, _ in pairs], dtype=int)
+    second = np.array([column[float(b)] for _, b in pairs], dtype=int)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized = snapshots.fluxes / conditions[None, :]
+    flux1, flux2 = normalized[:, first], normalized[:, second]    #(n_reactions, n_pairs)
+    diff = flux2 - flux1
+    cutoff = abs_tol if threshold is None else max(abs_tol, threshold)
+    keep = (np.abs(diff) > cutoff) & ~exclusion_mask(snapshots.reactions, exclude_exact, exclude_prefix)[:, None]
+    rxn_idx, pair_idx = np.nonzero(keep)
+    order = np.lexsort((np.abs(diff[rxn_idx, pair_idx]), pair_idx))
+    rxn_idx, pair_idx = rxn_idx[order], pair_idx[order]
+    return pd.DataFrame({
+        'val1': conditions[first][pair_idx],
+        'val2': conditions[second][pair_idx],
+        'reaction': np.asarray(snapshots.reactions, dtype=object)[rxn_idx],
+        'flux1_norm': flux1[rxn_idx, pair_idx],
+        'flux2_norm': flux2[rxn_idx, pair_idx],
+        'flux_difference': diff[rxn_idx, pair_idx],
+    })
@@ -0,0 +1,163 @@
+import numpy as np
+from collections import deque
+import pandas as pd
+from cobra.medium import minimal_medium
+from run_fba import get_session
+from set_dms import applied_medium, check_dm
+
+#Minimal media are searched inside a base medium: only the base medium's components may be kept, at their base medium lower bounds
+#   greedy: drop components one at a time on a warm-started FBASession, keeping each drop that leaves growth above the threshold
+#   milp: cobra.medium.minimal_medium with minimize_components, the smallest possible medium (slower, needs a MILP-capable solver for large media)
+
+def _uptaken(reactions, tol):
+    #IDs of the exchanges taken up in the last solution
+    return {rxn.id for rxn in reactions if rxn.forward_variable.primal - rxn.reverse_variable.primal < -tol}
+
+def _uptake_order(reference, rxn_ids):
+    #Components with the smallest uptake in the reference optimum first, they are the likeliest to be replaceable
+    return sorted(rxn_ids, key=lambda rxn_id: -min(reference.fluxes[rxn_id], 0))
+
+def _greedy(model, rxn_ids, objective, threshold, order, forbidden=(), tol=1e-9):
+    #One greedy pass on the medium already applied to model. Returns kept IDs (or None if the forbidden drops alone go below threshold), growth and LP count
+    #Bounds changed here are restored before returning
+    session = get_session(model)
+    reactions = {rxn_id: model.reactions.get_by_id(rxn_id) for rxn_id in rxn_ids}
+    solves = session.n_solves
+    try:
+        for rxn_id in forbidden:
+            session.set_bounds(rxn_id, lower_bound=0)
+        growth = session.slim_optimize(objective)
+        if np.isnan(growth) or growth < threshold:
+            return None, growth, session.n_solves - solves
+        kept = [rxn_id for rxn_id in rxn_ids if rxn_id not in forbidden]
+        imported = _uptaken([reactions[rxn_id] for rxn_id in kept], tol)
+        for rxn_id in [r for r in order if r in kept]:
+            if rxn_id not in imported:
+                #not taken up at the current optimum, which stays feasible without it: dropped without a solve
+                session.set_bounds(rxn_id, lower_bound=0)
+                kept.remove(rxn_id)
+                continue
+            session.set_bounds(rxn_id, lower_bound=0)
+            dropped_growth = session.slim_optimize(objective)
+            if np.isnan(dropped_growth) or dropped_growth < threshold:
+                session.reset(rxn_id)
+            else:
+                kept.remove(rxn_id)
+                growth = dropped_growth
+                imported = _uptaken([reactions[r] for r in kept], tol)
+        return kept, growth, session.n_solves - solves
+    finally:
+        session.reset()
+
+def greedy_minimal_medium(model, dm, fraction=0.5, objective='curated_biomass', order=None, tol=1e-9):
+    """
+    Finds an irreducible subset of a medium's components that keeps growth at or above a fraction of the full-medium growth
+
+    Args:
+        model (Cobra model): base CB model, the medium is applied and restored by this function
+        dm (str): base medium, any name accepted by set_dm
+        fraction (float): minimum growth kept, as a fraction of the growth in the full base medium
+        objective (str): objective reaction, default iGR632 biomass 'curated_biomass'
+        order (list): exchange IDs in the order removal is tried. Default tries the components with the smallest uptake flux in the full-medium optimum first
+        tol (float): exchange flux above -tol counts as not taken up
+    Returns:
+        medium (dict): exchange reaction ID -> base medium lower bound of the kept components, can be passed to register_medium
+        growth (float): objective flux in the minimal medium
+        full_growth (float): objective flux in the full base medium
+    Notes:
+        - Every removal is one warm-started slim solve on the model's FBASession, and components the current optimum does not take up are removed without a solve. A 50 component medium takes a few dozen LPs
+        - The result is irreducible: removing any single kept component drops growth below the threshold (growth never rises when uptakes are closed, so a removal that failed earlier still fails at the end). It is not guaranteed to be the smallest such medium, use milp_minimal_medium for that
+        - Different orders can give different irreducible media, see alternative_minimal_media
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    check_dm(dm)
+    with applied_medium(model, dm) as (media_model, media):
+        rxn_ids = [rxn.id for rxn in media]
+        reference = get_session(media_model).optimize(objective)
+        full_growth = reference.objective_value
+        if order is None:
+            order = _uptake_order(reference, rxn_ids)
+        kept, growth, _ = _greedy(media_model, rxn_ids, objective, fraction * full_growth, order, tol=tol)
+        medium = {rxn.id: lb for rxn, lb in media.items() if rxn.id in kept}
+    return medium, growth, full_growth
+
+def milp_minimal_medium(model, dm, fraction=0.5, objective='curated_biomass', alternatives=1):
+    """
+    Finds the smallest subset of a medium's components that keeps growth at or above a fraction of the full-medium growth, by cobra.medium.minimal_medium (MILP)
+
+    Args:
+        model (Cobra model): base CB model, the medium is applied and restored by this function
+        dm (str): base medium, any name accepted by set_dm
+        fraction (float): minimum growth kept, as a fraction of the growth in the full base medium
+        objective (str): objective reaction, default iGR632 biomass 'curated_biomass'
+        alternatives (int): number of alternative minimum-size media to return
+    Returns:
+        media (list): one dict per alternative, exchange reaction ID -> base medium lower bound. Empty if the MILP finds no medium
+        full_growth (float): objective flux in the full base medium
+    Notes:
+        - Exact minimum component count, but one MILP per alternative. Much slower than greedy_minimal_medium on large media, and GLPK may need a time limit (model.solver.configuration.timeout)
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    check_dm(dm)
+    with applied_medium(model, dm) as (media_model, media):
+        full_growth = get_session(media_model).slim_optimize(objective)
+        uptake = minimal_medium(media_model, min_objective_value=fraction * full_growth,
+                                minimize_components=alternatives if alternatives > 1 else True)
+        if uptake is None:
+            return [], full_growth
+        columns = [uptake[c] for c in uptake.columns] if isinstance(uptake, pd.DataFrame) else [uptake]
+        result = [{rxn.id: lb for rxn, lb in media.items() if rxn.id in col.index and col[rxn.id] > 0} for col in columns]
+    return result, full_growth
+
+def alternative_minimal_media(model, dm, n=5, fraction=0.5, objective='curated_biomass', tol=1e-9, max_searches=200):
+    """
+    Enumerates up to n different irreducible minimal media inside a base medium with the greedy search
+
+    Args:
+        model (Cobra model): base CB model, the medium is applied and restored by this function
+        dm (str): base medium, any name accepted by set_dm
+        n (int): maximum number of media returned
+        fraction (float): minimum growth kept, as a fraction of the growth in the full base medium
+        objective (str): objective reaction, default iGR632 biomass 'curated_biomass'
+        tol (float): exchange flux above -tol counts as not taken up
+        max_searches (int): maximum number of greedy searches, the enumeration stops there even if fewer than n media were found
+    Returns:
+        alternatives (pandas.core.frame.DataFrame): one row per medium found, columns 'size', 'exchanges' (tuple of kept exchange IDs, base medium order), 'growth' and 'forbidden' (components excluded to reach it)
+        full_growth (float): objective flux in the full base medium
+    Notes:
+        - Breadth-first over forbidden sets: after a medium is found, each of its components is forbidden in turn and the greedy search is re-run, so every new medium differs from the ones it branched from by at least one component
+        - Forbidden sets whose drops alone go below the threshold are not expanded further (closing more never raises growth)
+        - A search that lands on a medium already found is not expanded either. Without that (and max_searches) a base medium with fewer than n distinct media would be searched over every subset of its substitutable components
+        - All searches share one model with the medium applied and one warm FBASession
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    check_dm(dm)
+    rows = []
+    with applied_medium(model, dm) as (media_model, media):
+        rxn_ids = [rxn.id for rxn in media]
+        reference = get_session(media_model).optimize(objective)
+        full_growth = reference.objective_value
+        order = _uptake_order(reference, rxn_ids)
+        threshold = fraction * full_growth
+        found = set()
+        queue = deque([()])
+        seen = {frozenset()}
+        searches = 0
+        while queue and len(rows) < n and searches < max_searches:
+            forbidden = queue.popleft()
+            searches += 1
+            kept, growth, _ = _greedy(media_model, rxn_ids, objective, threshold, order, forbidden, tol)
+            if kept is None:
+                continue
+            key = frozenset(kept)
+            if key in found:
+                continue
+            found.add(key)
+            rows.append((len(kept), tuple(kept), growth, forbidden))
+            for rxn_id in kept:
+                branch = frozenset(forbidden) | {rxn_id}
+                if branch not in seen:
+                    seen.add(branch)
+                    queue.append(forbidden + (rxn_id,))
+    alternatives = pd.DataFrame(rows, columns=['size', 'exchanges', 'growth', 'forbidden'])
+    return alternatives, full_growth
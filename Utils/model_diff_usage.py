@@ -0,0 +1,102 @@
+import argparse
+import cobra
+import pandas as pd
+import sim_cache
+from sim_cache import model_state, is_stale
+
+#Differences between two model versions, and which cached simulations they make stale
+#   diff_models: reaction-level changes (added, removed, bounds, stoichiometry, gpr)
+#   stale_report: applies the changes to every cached entry's model state and checks it with sim_cache.is_stale
+#   The cache reuses the entries that are not stale on its own when the scripts are re-run on the new version, this module only reports what will re-run
+
+def diff_models(old, new):
+    """
+    Compares two cobra models reaction by reaction
+
+    Args:
+        old, new (Cobra model): model versions to compare, e.g. iGR632_v37 and its curated successor
+    Returns:
+        diff (pandas.core.frame.DataFrame): one row per change, columns 'reaction', 'change' ('added', 'removed', 'bounds', 'stoichiometry', 'gpr'), 'old' and 'new' (bounds tuple, reaction string or GPR)
+    Notes:
+        - A reaction can have several rows, e.g. both bounds and gpr
+        - GPR changes are listed but do not change FBA results, they never make cached simulations stale
+    """
+    rows = []
+    old_ids = {rxn.id for rxn in old.reactions}
+    new_ids = {rxn.id for rxn in new.reactions}
+    for rxn in old.reactions:
+        if rxn.id not in new_ids:
+            rows.append((rxn.id, 'removed', rxn.reaction, None))
+    for rxn in new.reactions:
+        if rxn.id not in old_ids:
+            rows.append((rxn.id, 'added', None, rxn.reaction))
+            continue
+        before = old.reactions.get_by_id(rxn.id)
+        if before.bounds != rxn.bounds:
+            rows.append((rxn.id, 'bounds', before.bounds, rxn.bounds))
+        if {met.id: coef for met, coef in before.metabolites.items()} != {met.id: coef for met, coef in rxn.metabolites.items()}:
+            rows.append((rxn.id, 'stoichiometry', before.reaction, rxn.reaction))
+        if before.gene_reaction_rule != rxn.gene_reaction_rule:
+            rows.append((rxn.id, 'gpr', before.gene_reaction_rule, rxn.gene_reaction_rule))
+    return pd.DataFrame(rows, columns=['reaction', 'change', 'old', 'new'])
+
+def _project(entry_state, old_base, new_base):
+    #The state an entry would have on the new version: reactions changed between the versions take their new state, except bounds the call itself had set (e.g. a medium), which are kept
+    projected = dict(entry_state)
+    for rxn_id in set(old_base) | set(new_base):
+        o, n = old_base.get(rxn_id), new_base.get(rxn_id)
+        if o == n:
+            continue
+        if n is None:
+            projected.pop(rxn_id, None)
+        elif o is None or rxn_id not in projected:
+            projected[rxn_id] = n
+        else:
+            e = projected[rxn_id]
+            bounds = n[1:] if e[1:] == o[1:] else e[1:]
+            projected[rxn_id] = (n[0],) + tuple(bounds)
+    return projected
+
+def stale_report(old, new, strict=True):
+    """
+    Lists the cached simulations a new model version makes stale
+
+    Args:
+        old, new (Cobra model): model versions, as loaded by the scripts (no medium applied)
+        strict (bool): passed to sim_cache.is_stale. True (default, what the cache does) treats every added reaction or stoichiometry change as stale, False only those touching the active network
+    Returns:
+        report (pandas.core.frame.DataFrame): one row per cache entry, columns 'func', 'call', 'n_active', 'stale' and 'reasons' ((reaction, change) pairs)
+    Notes:
+        - Entries computed on other model versions (their unchanged reactions differ from old) are checked the same way, against the changes between old and new only
+        - The cache must be enabled (IGR632_SIM_CACHE or sim_cache.enable()), an empty report otherwise
+    """
+    _, old_base, _ = model_state(old)
+    _, new_base, _ = model_state(new)
+    metabolites_of = lambda rxn_id: [met.id for met in new.reactions.get_by_id(rxn_id).metabolites]
+    rows = []
+    for record in sim_cache.entries():
+        entry_state = sim_cache.load_state(record['state'])
+        if entry_state is None:
+            continue
+        active = set(record['active'])
+        stale, reasons = is_stale(entry_state, _project(entry_state, old_base, new_base), active, metabolites_of, strict)
+        rows.append((record['func'], record['call'], len(active), stale, reasons))
+    return pd.DataFrame(rows, columns=['func', 'call', 'n_active', 'stale', 'reasons'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two SBML model versions and report the cached simulations they make stale")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--loose', action='store_true', help="only count added or changed reactions sharing a metabolite with an entry's active network (IGR632_SIM_CACHE_STRICT=0)")
+    parser.add_argument('--cache', default=None, help="cache directory, default IGR632_SIM_CACHE")
+    args = parser.parse_args()
+    if args.cache:
+        sim_cache.enable(args.cache)
+    old_model = cobra.io.read_sbml_model(args.old)
+    new_model = cobra.io.read_sbml_model(args.new)
+    diff = diff_models(old_model, new_model)
+    print(diff.to_string(index=False) if len(diff) else "No reaction changes")
+    report = stale_report(old_model, new_model, strict=not args.loose)
+    if len(report):
+        print(f"\n{int(report['stale'].sum())} of {len(report)} cached simulations stale")
+        print(report.groupby('func')['stale'].agg(['sum', 'count']).rename(columns={'sum': 'stale', 'count': 'entries'}).to_string())
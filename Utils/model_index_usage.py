@@ -0,0 +1,176 @@
+import weakref
+import numpy as np
+
+#Compartment IDs treated as extracellular (iGR632 and AGORA use 'e', some SBML exports 'C_e' or 'e0')
+EXTRACELLULAR = ('e', 'C_e', 'e0', 'extracellular')
+#Reactions with at least this many metabolites are classed as biomass, besides IDs containing 'biomass'
+BIOMASS_MIN_METABOLITES = 20
+REACTION_CLASSES = ('exchange', 'demand', 'sink', 'transport', 'biomass')
+
+class ModelIndex:
+    """
+    Compartment and reaction-class lookups for one model, computed once from the stoichiometry.
+
+    Args:
+        model (Cobra model): CB model to index
+    Notes:
+        - Every compartment gets one bit, compartment_bits[i] is the bitset of the compartments the metabolites of model.reactions[i] are in
+        - Classes, from the stoichiometry rather than the ID:
+            exchange: one metabolite, extracellular
+            demand: one metabolite, not extracellular, can only consume it
+            sink: one metabolite, not extracellular, reversible
+            transport: metabolites in two or more compartments
+            biomass: IDs containing 'biomass' and reactions with BIOMASS_MIN_METABOLITES or more metabolites (not the current objective, which changes between scripts)
+        - demand and sink are the only classes that also depend on bounds: stoichiometry alone cannot tell them apart. They are re-derived from the current bound directions of the internal single-metabolite reactions (boundary_positions, a handful) whenever they are looked up
+        - Lookups (in_compartment, reactions_in, is_class, of_class) are set or dict lookups. Positions are only valid while the model keeps the same reactions, get_index rebuilds when reactions_token changes
+        - Only IDs, positions, arrays and a weak reference to the model are stored, no cobra objects, so the per-model registry does not keep models alive
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    def __init__(self, model):
+        reactions = model.reactions
+        self.token = reactions_token(model)
+        self._model = weakref.ref(model)
+        self.compartments = sorted(model.compartments)
+        self.bit = {c: 1 << i for i, c in enumerate(self.compartments)}
+        self.position = {rxn.id: i for i, rxn in enumerate(reactions)}
+        extracellular = 0
+        for c in self.compartments:
+            if c in EXTRACELLULAR or 'extracellular' in str(model.compartments[c]).lower():
+                extracellular |= self.bit[c]
+        self.extracellular_bits = extracellular
+        bits = np.zeros(len(reactions), dtype=np.uint64)
+        classes = {name: np.zeros(len(reactions), dtype=bool) for name in REACTION_CLASSES}
+        boundary = []
+        self._boundary_coefficients = []
+        for i, rxn in enumerate(reactions):
+            metabolites = rxn.metabolites
+            b = 0
+            for met in metabolites:
+                b |= self.bit.get(met.compartment, 0)
+            bits[i] = b
+            if len(metabolites) == 1:
+                (met, coef), = metabolites.items()
+                if b & extracellular:
+                    classes['exchange'][i] = True
+                    continue
+                boundary.append(i)
+                self._boundary_coefficients.append(coef)
+            if bin(b).count('1') >= 2:
+                classes['transport'][i] = True
+            if 'biomass' in rxn.id.lower() or len(metabolites) >= BIOMASS_MIN_METABOLITES:
+                classes['biomass'][i] = True
+        classes['transport'] &= ~classes['biomass']
+        self.compartment_bits = bits
+        self.boundary_positions = boundary
+        self.classes = classes
+        ids = np.array([rxn.id for rxn in reactions], dtype=object)
+        self._ids = ids
+        self._members = {name: frozenset(ids[mask].tolist()) for name, mask in classes.items()}
+        self.boundary_signature = None
+        self._classify_boundary(boundary_signature(model, boundary))
+        self._in_compartment = {c: frozenset(ids[(bits & np.uint64(self.bit[c])) != 0].tolist()) for c in self.compartments}
+        self._in_compartment['extracellular'] = frozenset(ids[(bits & np.uint64(extracellular)) != 0].tolist())
+
+    def _classify_boundary(self, signature):
+        #Splits the internal single-metabolite reactions into demand (can only consume its metabolite) and sink (reversible) from their bound directions
+        sink = self.classes['sink']
+        demand = self.classes['demand']
+        sink[:] = False
+        demand[:] = False
+        for i, coef, (can_reverse, can_forward) in zip(self.boundary_positions, self._boundary_coefficients, signature):
+            if can_reverse and can_forward:
+                sink[i] = True
+            elif (coef < 0 and can_forward) or (coef > 0 and can_reverse):
+                demand[i] = True
+        self._members['sink'] = frozenset(self._ids[sink].tolist())
+        self._members['demand'] = frozenset(self._ids[demand].tolist())
+        self.boundary_signature = signature
+
+    def _check_boundary(self, name):
+        #Only demand and sink lookups look at the bounds, and only of the boundary reactions
+        if name not in ('demand', 'sink'):
+            return
+        model = self._model()
+        if model is None:
+            return
+        signature = boundary_signature(model, self.boundary_positions)
+        if signature != self.boundary_signature:
+            self._classify_boundary(signature)
+
+    def compartments_of(self, rxn_id):
+        """
+        Returns the compartments the metabolites of a reaction are in.
+        """
+        b = int(self.compartment_bits[self.position[rxn_id]])
+        return {c for c in self.compartments if b & self.bit[c]}
+
+    def reactions_in(self, compartment):
+        """
+        Returns the IDs of the reactions with at least one metabolite in a compartment ('extracellular' for all extracellular compartments).
+        """
+        return self._in_compartment[compartment]
+
+    def in_compartment(self, rxn_id, compartment):
+        return rxn_id in self._in_compartment[compartment]
+
+    def of_class(self, name):
+        """
+        Returns the IDs of the reactions of a class ('exchange', 'demand', 'sink', 'transport' or 'biomass').
+        """
+        self._check_boundary(name)
+        return self._members[name]
+
+    def is_class(self, rxn_id, name):
+        self._check_boundary(name)
+        return rxn_id in self._members[name]
+
+    def positions(self, name):
+        """
+        Returns the positions in model.reactions of the reactions of a class, in model order.
+        """
+        self._check_boundary(name)
+        return np.flatnonzero(self.classes[name])
+
+def boundary_signature(model, positions):
+    #Bound directions of the internal single-metabolite reactions, what the demand/sink split depends on
+    reactions = model.reactions
+    return tuple((reactions[i].lower_bound < 0, reactions[i].upper_bound > 0) for i in positions)
+
+def reactions_token(model):
+    """
+    Cheap summary of model.reactions for invalidating per-model caches in O(1): the list object, its length and its first and last reactions (weak references and IDs).
+    Adding or removing reactions changes it, see same_reactions.
+    """
+    reactions = model.reactions
+    if not len(reactions):
+        return (id(reactions), 0)
+    first, last = reactions[0], reactions[-1]
+    return (id(reactions), len(reactions), weakref.ref(first), first.id, weakref.ref(last), last.id)
+
+def same_reactions(token, model):
+    """
+    Returns whether model.reactions still matches a reactions_token, i.e. positions computed with it are still valid.
+
+    Notes:
+        - Catches added and removed reactions (the length changes, or the last reaction when one is removed and another added), and changes at either end of the list
+        - Not caught: renaming a reaction in the middle of the list, or moving reactions around while keeping the count and both ends. Rebuild explicitly after such edits (get_index(model, rebuild=True))
+    """
+    reactions = model.reactions
+    if token[0] != id(reactions) or token[1] != len(reactions):
+        return False
+    if not len(reactions):
+        return True
+    first, last = reactions[0], reactions[-1]
+    return token[2]() is first and token[3] == first.id and token[4]() is last and token[5] == last.id
+
+_indexes = weakref.WeakKeyDictionary()
+
+def get_index(model, rebuild=False):
+    """
+    Returns the ModelIndex of a model, building it on first use and again when its reactions changed (see same_reactions) or rebuild is True. The check is O(1), so it can be called per lookup.
+    """
+    index = _indexes.get(model)
+    if rebuild or index is None or not same_reactions(index.token, model):
+        index = ModelIndex(model)
+        _indexes[model] = index
+    return index
@@ -0,0 +1,73 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+#Columnar store for validation results, one Parquet dataset per table under the store directory:
+#   exchanges/model=<model>/medium=<medium>/*.parquet: per-exchange fold changes and labels
+#   metrics/model=<model>/medium=<medium>/*.parquet: one row of confusion counts, metrics and full growth rate per medium
+#Writing a model/medium pair replaces only that partition, so media and models can be (re)written independently
+PARTITIONING = ds.partitioning(pa.schema([('model', pa.string()), ('medium', pa.string())]), flavor='hive')
+
+def write_table(store, name, df, model, medium):
+    """
+    Writes df as the (model, medium) partition of the named table, replacing what was there.
+    """
+    df = df.assign(model=str(model), medium=str(medium))
+    ds.write_dataset(pa.Table.from_pandas(df, preserve_index=False), os.path.join(store, name), format='parquet',
+                     partitioning=PARTITIONING, existing_data_behavior='delete_matching',
+                     basename_template='part-{i}.parquet')
+
+def write_validation(store, medium, exchanges, summary, model='iGR632'):
+    """
+    Stores the results of one validation medium
+
+    Args:
+        store (str): store directory, created if missing
+        medium (str): medium name, e.g. '57' or 'sun'
+        exchanges (pandas.core.frame.DataFrame): one row per exchange, e.g. exchange, IV, IS, growth, skipped, label
+        summary (dict): scalar results for the medium, e.g. TN, FP, FN, TP, accuracy, recall, precision, specificity, fpr, full_growth, threshold
+        model (str): model name, partitions the store so several models can be compared
+    Notes:
+        - Re-running a medium replaces its partitions, results of other media and models are kept
+    """
+    write_table(store, 'exchanges', exchanges, model, medium)
+    write_table(store, 'metrics', pd.DataFrame([summary]), model, medium)
+
+def open_table(store, name):
+    """
+    Returns the named table as a lazy pyarrow dataset, nothing is read until to_table / read_table. None if the table has not been written.
+    """
+    path = os.path.join(store, name)
+    if not os.path.isdir(path):
+        return None
+    return ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+
+def read_table(store, name, model=None, media=None, columns=None):
+    """
+    Reads part of a table into a DataFrame
+
+    Args:
+        store (str): store directory
+        name (str): 'exchanges' or 'metrics'
+        model (str): only this model. Default None reads all models
+        media (list): only these media. Default None reads all media
+        columns (list): only these columns (model and medium are always included)
+    Returns:
+        df (pandas.core.frame.DataFrame): None if the table has not been written or nothing matches
+    Notes:
+        - Partitions that do not match model/media are skipped without opening their files, and only the requested columns are read
+    """
+    dataset = open_table(store, name)
+    if dataset is None:
+        return None
+    expression = None
+    if model is not None:
+        expression = ds.field('model') == str(model)
+    if media is not None:
+        media_filter = ds.field('medium').isin([str(m) for m in media])
+        expression = media_filter if expression is None else expression & media_filter
+    if columns is not None:
+        columns = list(dict.fromkeys(['model', 'medium'] + list(columns)))
+    df = dataset.to_table(filter=expression, columns=columns).to_pandas()
+    return df if len(df) else None
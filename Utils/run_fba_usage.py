@@ -1,30 +1,163 @@
 import cobra
+import weakref
+from cobra.flux_analysis import flux_variability_analysis
+from sim_cache import cached
+from sim_trace import traced
+
+@traced
 def fba(model, objective='curated_biomass'):
-     """
-    Runs FBA simulation on a cobra model object for maximization of specified objective function 
+    """
+    Runs FBA simulation on a cobra model object for maximization of specified objective function
 
     Args:
-        model (Cobra model): CB model to run simulation on 
-        objective (str): desired objective function for simulation. Default is iGR632 LGG model biomass function 'curated_biomass', but could be any model rxn  
-    Returns: 
-        result (cobra.core.solution.Solution): Cobrapy solution object 
+        model (Cobra model): CB model to run simulation on
+        objective (str): desired objective function for simulation. Default is iGR632 LGG model biomass function 'curated_biomass', but could be any model rxn
+    Returns:
+        result (cobra.core.solution.Solution): Cobrapy solution object
     Notes:
         - Model is constrained previously (example, set_dm must be run first to simulate DM condition)
-        - KeyError if objective reaction input does not exist in model 
-        - Solution object contains: 
-            fluxes (pandas.core.series.Series) 
+        - KeyError if objective reaction input does not exist in model
+        - Solution object contains:
+            fluxes (pandas.core.series.Series)
             get_primal_by_id function (method)
             objective value (float)
             shadow prices (pandas.core.series.Series)
             reduced costs (pandas.core.series.Series)
             to_frame function (method)
-            status (str) 
+            status (str)
+        - Runs through the model's FBASession (see get_session), so repeated calls on the same model skip objective re-assignment and warm start from the previous basis
+        - The objective is set on the model even when the solution comes from the simulation cache (see sim_cache)
+        - Recorded by sim_trace when tracing is on
         - Cobrapy Version: 0.29.1, Python Version: 3.9.12
     """
-        #Set objective function 
-        model.objective=model.reactions.get_by_id(objective)
-        #designation optimization directionality. 
-        model.objective_direction='max'
-        #perform optimization 
-        result=model.optimize()
-        return result
+    session = get_session(model)
+    session.set_objective(objective)
+    return _optimize(model)
+
+@cached
+def _optimize(model):
+    return get_session(model).optimize()
+
+@traced
+@cached(ignore=('processes',))
+def fva(model, reaction_list=None, loopless=False, fraction_of_optimum=1.0, pfba_factor=None, processes=None):
+    """
+    Runs flux variability analysis on a cobra model object with its current objective
+
+    Args:
+        model (Cobra model): CB model to run simulation on
+        reaction_list (list): reactions or reaction IDs to assess. Default None assesses all reactions
+        loopless, fraction_of_optimum, pfba_factor, processes: passed to cobra.flux_analysis.flux_variability_analysis
+    Returns:
+        result (pandas.core.frame.DataFrame): minimum and maximum flux of each reaction, indexed by reaction ID
+    Notes:
+        - Model is constrained previously (example, set_dm must be run first to simulate DM condition)
+        - Results are served from the simulation cache when it is enabled and the model has not changed (see sim_cache)
+        - Recorded by sim_trace when tracing is on
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    return flux_variability_analysis(model, reaction_list=reaction_list, loopless=loopless,
+                                     fraction_of_optimum=fraction_of_optimum, pfba_factor=pfba_factor, processes=processes)
+
+class FBASession:
+    """
+    Keeps one LP alive for a cobra model and applies bound changes to it as deltas, so loops that flip one bound per solve (dropouts, carbon source swaps) do not rebuild the problem each time.
+
+    Args:
+        model (Cobra model): CB model to run simulations on. The session works on the model in place, no copy is made
+        objective (str): objective reaction to maximize, e.g. iGR632 LGG model biomass function 'curated_biomass'. Default None keeps the objective already set on the model
+    Notes:
+        - The solver problem attached to the model is reused between solves, so the previous optimal basis is the starting point of the next solve (GLPK presolve is switched off for this, since presolve discards the basis)
+        - The objective is only re-assigned when a different reaction is requested or when something outside the session replaced model.objective
+        - set_bounds records the first bounds it sees for each reaction; reset puts them back
+        - Use slim_optimize when only the objective value is needed, it skips building the cobra Solution object (fluxes, shadow prices, reduced costs)
+        - The session only holds a weak reference to the model, so get_session's registry does not keep models (or their copies) alive
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    def __init__(self, model, objective=None):
+        self._model = weakref.ref(model)
+        self.objective = None
+        self.n_solves = 0
+        self._solver_objective = None
+        self._original_bounds = {}
+        if model.solver.interface.__name__.endswith('glpk_interface'):
+            model.solver.configuration.presolve = False
+        self.set_objective(objective)
+
+    @property
+    def model(self):
+        return self._model()
+
+    def set_objective(self, objective, direction='max'):
+        """
+        Sets the objective reaction and direction, skipping the update when nothing changed.
+        """
+        if objective is None:
+            objective = self.objective
+        stale = self.model.solver.objective is not self._solver_objective
+        if objective is not None and (stale or objective != self.objective):
+            self.model.objective = self.model.reactions.get_by_id(objective)
+            self.objective = objective
+        if self.model.solver.objective.direction != direction:
+            self.model.objective_direction = direction
+        self._solver_objective = self.model.solver.objective
+
+    def set_solver_objective(self, objective):
+        """
+        Installs an objective that is not a single reaction (an optlang Objective, e.g. the total flux minimized for parsimonious solutions) and tracks it like set_objective does.
+        Solve it with slim_optimize(direction=objective.direction), set_objective with a reaction ID switches back.
+        """
+        self.model.objective = objective
+        self.objective = None
+        self._solver_objective = self.model.solver.objective
+
+    def set_bounds(self, rxn_id, lower_bound=None, upper_bound=None):
+        """
+        Applies a bound delta to one reaction. Bounds passed as None are left as they are, and nothing is sent to the solver if the bounds are unchanged.
+        """
+        rxn = self.model.reactions.get_by_id(rxn_id)
+        if rxn_id not in self._original_bounds:
+            self._original_bounds[rxn_id] = rxn.bounds
+        lb = rxn.lower_bound if lower_bound is None else lower_bound
+        ub = rxn.upper_bound if upper_bound is None else upper_bound
+        if (lb, ub) != rxn.bounds:
+            rxn.bounds = lb, ub
+
+    def reset(self, rxn_id=None):
+        """
+        Restores the bounds recorded by set_bounds, for one reaction or for all of them.
+        """
+        rxn_ids = list(self._original_bounds) if rxn_id is None else [rxn_id]
+        for i in rxn_ids:
+            bounds = self._original_bounds.pop(i)
+            rxn = self.model.reactions.get_by_id(i)
+            if rxn.bounds != bounds:
+                rxn.bounds = bounds
+
+    def optimize(self, objective=None, direction='max'):
+        """
+        Solves and returns the full cobra Solution object, same as fba().
+        """
+        self.set_objective(objective, direction)
+        self.n_solves += 1
+        return self.model.optimize()
+
+    def slim_optimize(self, objective=None, direction='max', error_value=float('nan')):
+        """
+        Solves and returns only the objective value. Returns error_value (default NaN) if the problem is not optimal.
+        """
+        self.set_objective(objective, direction)
+        self.n_solves += 1
+        return self.model.slim_optimize(error_value=error_value)
+
+_sessions = weakref.WeakKeyDictionary()
+
+def get_session(model):
+    """
+    Returns the FBASession attached to a model, creating it on first use. fba() and the loop scripts share this session, so they share the warm start.
+    """
+    session = _sessions.get(model)
+    if session is None:
+        session = FBASession(model)
+        _sessions[model] = session
+    return session
@@ -1,4 +1,304 @@
 import cobra
+import weakref
+import numpy as np
+from contextlib import contextmanager
+from cobra.medium import minimal_medium
+from model_index import get_index, reactions_token, same_reactions
+
+#Media registry. Keys are the names accepted by set_dm, values map exchange reaction IDs (iGR632 namespace) to lower bounds
+#Concentrations of DM components are relative uptake rates, glucose = -10
+#   '57', '25', '16', '13': DM series formulations
+#   'sun': Sun et al. 2019 chemically defined medium used for the dropout validation
+MEDIA = {
+    '57': {
+        'EX_4abut_e': -0.238239650186896,
+        'EX_adn_e': -0.909023633807176,
+        'EX_ala_L_e': -3.43941818181818,
+        'EX_arg_L_e': -0.282058240267196,
+        'EX_asn_L_e': -0.0929733300305507,
+        'EX_asp_L_e': -0.55373266853357,
+        'EX_btn_e': -0.502788930606048,
+        'EX_C00072_e': -0.697458344517168,
+        'EX_cbl1_e': -0.00906293953948838,
+        'EX_cit_e': -2.17226868802977,
+        'EX_cobalt2_e': -0.710036784025223,
+        'EX_csn_e': -0.44225513460437,
+        'EX_cu2_e': -0.000983950365558824,
+        'EX_cys_L_e': -1.16893013200794,
+        'EX_cytd_e': -0.101009685701545,
+        'EX_fe2_e': -0.0323445102064021,
+        'EX_fol_e': -0.000556576183218685,
+        'EX_glc_D_e': -10,
+        'EX_glu_L_e': -0.500929913558201,
+        'EX_gly_e': -0.837744,
+        'EX_gua_e': -0.487671661363185,
+        'EX_his_L_e': -0.65449154972054,
+        'EX_ile_L_e': -0.468006545454545,
+        'EX_inost_e': -0.00681833698681884,
+        'EX_k_e': -19.7463439075564,
+        'EX_leu_L_e': -0.468006545454545,
+        'EX_lys_L_e': -0.881965090909091,
+        'EX_met_L_e': -0.164648969420768,
+        'EX_mg2_e': -5.10261883074804,
+        'EX_mn2_e': -0.0221638272953635,
+        'EX_mops_e': -9.82706405984726,
+        'EX_na1_e': -0.0840769087175658,
+        'EX_nac_e': -0.0402313481163887,
+        'EX_NH4_e': -7.08581509092581,
+        'EX_phe_L_e': -0.371702836363636,
+        'EX_pnto_R_e': -0.00515545143585351,
+        'EX_pro_L_e': -0.426767062628509,
+        'EX_pydx_e': -0.0120652552437249,
+        'EX_ribflv_e': -0.0130548864158699,
+        'EX_ser_L_e': -1.81153897697883,
+        'EX_thm_e': -0.185161838463014,
+        'EX_thr_L_e': -0.515417920291105,
+        'EX_thym_e': -0.0584424852762019,
+        'EX_trp_L_e': -0.336817309090909,
+        'EX_tyr_L_e': -0.271098358335077,
+        'EX_ura_e': -0.00438361724922243,
+        'EX_val_L_e': -0.209711414000006,
+        'EX_xan_e': -0.0193811894502184,
+        'EX_zn2_e': -0.00854216715134657,
+        'EX_pi_e': -19.7463439075564,
+        'EX_h_e': -0.0120652552437249,
+        'EX_hco3_e': -1,
+    },
+    '25': {
+        'EX_arg_L_e': -0.282058240267196,
+        'EX_asn_L_e': -0.0929733300305507,
+        'EX_asp_L_e': -0.55373266853357,
+        'EX_C00072_e': -0.697458344517168,
+        'EX_cit_e': -2.17226868802977,
+        'EX_cobalt2_e': -0.710036784025223,
+        'EX_cys_L_e': -1.16893013200794,
+        'EX_cytd_e': -0.101009685701545,
+        'EX_glc_D_e': -10,
+        'EX_glu_L_e': -0.500929913558201,
+        'EX_his_L_e': -0.65449154972054,
+        'EX_ile_L_e': -0.468006545454545,
+        'EX_k_e': -19.7463439075564,
+        'EX_met_L_e': -0.164648969420768,
+        'EX_mg2_e': -5.10261883074804,
+        'EX_mops_e': -9.82706405984726,
+        'EX_NH4_e': -7.08581509092581,
+        'EX_pro_L_e': -0.426767062628509,
+        'EX_ser_L_e': -1.81153897697883,
+        'EX_ura_e': -0.00438361724922243,
+        'EX_val_L_e': -0.209711414000006,
+        'EX_xan_e': -0.0193811894502184,
+        'EX_pi_e': -19.7463439075564,
+        'EX_h_e': -0.0120652552437249,
+        'EX_hco3_e': -1,
+    },
+    '16': {
+        'EX_arg_L_e': -0.282058240267196,
+        'EX_asn_L_e': -0.0929733300305507,
+        'EX_asp_L_e': -0.55373266853357,
+        'EX_cobalt2_e': -0.710036784025223,
+        'EX_cys_L_e': -1.16893013200794,
+        'EX_cytd_e': -0.101009685701545,
+        'EX_glc_D_e': -10,
+        'EX_glu_L_e': -0.500929913558201,
+        'EX_his_L_e': -0.65449154972054,
+        'EX_ile_L_e': -0.468006545454545,
+        'EX_k_e': -19.7463439075564,
+        'EX_mg2_e': -5.10261883074804,
+        'EX_mops_e': -9.82706405984726,
+        'EX_NH4_e': -7.08581509092581,
+        'EX_pro_L_e': -0.426767062628509,
+        'EX_val_L_e': -0.209711414000006,
+        'EX_pi_e': -19.7463439075564,
+        'EX_h_e': -0.0120652552437249,
+        'EX_hco3_e': -1,
+    },
+    '13': {
+        'EX_arg_L_e': -0.282058240267196,
+        'EX_asn_L_e': -0.0929733300305507,
+        'EX_asp_L_e': -0.55373266853357,
+        'EX_cobalt2_e': -0.710036784025223,
+        'EX_cys_L_e': -1.16893013200794,
+        'EX_glc_D_e': -10,
+        'EX_glu_L_e': -0.500929913558201,
+        'EX_his_L_e': -0.65449154972054,
+        'EX_ile_L_e': -0.468006545454545,
+        'EX_k_e': -19.7463439075564,
+        'EX_mg2_e': -5.10261883074804,
+        'EX_pro_L_e': -0.426767062628509,
+        'EX_val_L_e': -0.209711414000006,
+        'EX_pi_e': -19.7463439075564,
+        'EX_h_e': -0.0120652552437249,
+        'EX_hco3_e': -1,
+    },
+    'sun': {
+        'EX_adn_e': -0.004,
+        'EX_ala_D_e': -0.2,
+        'EX_NH4_e': -1.2,
+        'EX_arg_L_e': -0.4,
+        'EX_asn_L_e': -0.44,
+        'EX_asp_L_e': -0.32,
+        'EX_btn_e': -0.002,
+        'EX_cbl1_e': -0.002,
+        'EX_cys_L_e': -0.6,
+        'EX_k_e': -0.48,
+        'EX_fol_e': -0.002,
+        'EX_glc_D_e': -10,
+        'EX_glu_L_e': -0.48,
+        'EX_gln_L_e': -0.4,
+        'EX_gly_e': -0.16,
+        'EX_gua_e': -0.004,
+        'EX_his_L_e': -0.176,
+        'EX_fe2_e': -0.004,
+        'EX_ile_L_e': -0.2,
+        'EX_leu_L_e': -0.2,
+        'EX_lys_L_e': -0.42,
+        'EX_mg2_e': -0.08,
+        'EX_mn2_e': -0.004,
+        'EX_met_L_e': -0.08,
+        'EX_inost_e': -0.002,
+        'EX_nac_e': -0.0016,
+        'EX_pnto_R_e': -0.002,
+        'EX_phe_L_e': -0.2,
+        'EX_pro_L_e': -0.16,
+        'EX_pydx_e': -0.0016,
+        'EX_ribflv_e': -0.002,
+        'EX_ser_L_e': -0.62,
+        'EX_na1_e': -8,
+        'EX_thm_e': -0.002,
+        'EX_thr_L_e': -0.2,
+        'EX_trp_L_e': -0.224,
+        'EX_tyr_L_e': -0.16,
+        'EX_ura_e': -0.004,
+        'EX_val_L_e': -0.4,
+        'EX_xan_e': -0.004,
+        'EX_ac_e': -8,
+        'EX_hco3_e': -1,
+        'EX_pi_e': -0.48,
+        'EX_h_e': -0.48,
+    },
+}
+
+#Media that are derived from a registered medium on the model they are applied to, rather than listed component by component
+#   'model_min': components of DM57 that the model takes up in its minimal total uptake solution at full DM57 growth, at their DM57 uptake rates
+#   'objective' is the reaction the derivation optimizes, fixed so the derived medium does not depend on whatever objective the model has when it is first applied
+DERIVED_MEDIA = {
+    'model_min': {'base': '57', 'rule': 'minimal_uptake', 'objective': 'curated_biomass'},
+}
+
+class CompiledMedium:
+    """
+    A medium resolved against one model: index arrays of exchange positions in model.reactions and the lower bounds to put on them.
+
+    Args:
+        model (Cobra model): CB model the medium is compiled for
+        name (str): registry name of the medium
+        composition (dict): exchange reaction ID -> lower bound
+    Notes:
+        - index covers every exchange of the model (the ModelIndex exchange class), lower_bounds is 0 for exchanges that are not part of the medium
+        - Positions are only valid while the model keeps the same reactions. get_compiled_medium recompiles when reactions are added or removed (an O(1) check, see model_index.same_reactions)
+        - Only reaction IDs and positions are stored, no cobra objects, so the per-model registry does not keep models alive
+        - KeyError if a medium component does not exist in the model
+    """
+    def __init__(self, model, name, composition):
+        reactions = model.reactions
+        self.name = name
+        self.token = reactions_token(model)
+        missing = [rxn_id for rxn_id in composition if rxn_id not in reactions]
+        if missing:
+            raise KeyError(f"Medium '{name}' has exchanges not found in model {model.id}: {missing}")
+        self.medium_index = np.array([reactions.index(rxn_id) for rxn_id in composition], dtype=int)
+        self.medium_bounds = np.array(list(composition.values()), dtype=float)
+        self.index = np.union1d(get_index(model).positions('exchange'), self.medium_index)
+        self.lower_bounds = np.zeros(len(self.index))
+        self.lower_bounds[np.searchsorted(self.index, self.medium_index)] = self.medium_bounds
+        self.medium_ids = [reactions[i].id for i in self.medium_index.tolist()]
+
+    def media(self, model):
+        """
+        Returns the medium as set_dm reports it: cobra reaction object -> lower bound.
+        """
+        reactions = model.reactions
+        return {reactions[i]: lb for i, lb in zip(self.medium_index.tolist(), self.medium_bounds.tolist())}
+
+    def changed_positions(self, model):
+        """
+        Returns the positions in self.index whose current lower bound differs from the medium.
+        """
+        reactions = model.reactions
+        current = np.fromiter((reactions[i].lower_bound for i in self.index.tolist()), dtype=float, count=len(self.index))
+        return np.flatnonzero(current != self.lower_bounds)
+
+    def apply(self, model):
+        """
+        Sets the medium on the model. Only exchanges whose lower bound differs are sent to the solver.
+        Returns the touched reaction positions and their previous lower bounds, which is all restore needs.
+        """
+        reactions = model.reactions
+        positions = self.changed_positions(model)
+        changed = self.index[positions]
+        previous = np.fromiter((reactions[i].lower_bound for i in changed.tolist()), dtype=float, count=len(changed))
+        for i, lb in zip(changed.tolist(), self.lower_bounds[positions].tolist()):
+            reactions[i].lower_bound = lb
+        return changed, previous
+
+    @staticmethod
+    def restore(model, changed, previous):
+        """
+        Puts back the lower bounds returned by apply.
+        """
+        reactions = model.reactions
+        for i, lb in zip(changed.tolist(), previous.tolist()):
+            reactions[i].lower_bound = lb
+
+_compiled = weakref.WeakKeyDictionary()
+
+def register_medium(name, composition):
+    """
+    Adds or replaces a medium in the registry. composition maps exchange reaction IDs to lower bounds.
+    """
+    MEDIA[name] = dict(composition)
+    stale = [name] + [derived for derived, spec in DERIVED_MEDIA.items() if spec['base'] == name]    #media derived from it are derived again on next use
+    for compiled in _compiled.values():
+        for dm in stale:
+            compiled.pop(dm, None)
+
+def check_dm(dm):
+    """
+    Raises ValueError unless dm is a registered (MEDIA) or derived (DERIVED_MEDIA) medium name.
+    """
+    if dm not in MEDIA and dm not in DERIVED_MEDIA:
+        valid_dms = list(MEDIA) + list(DERIVED_MEDIA)
+        raise ValueError(f"Invalid DM '{dm}' passed. Must be one of {valid_dms}.")
+
+def _derive_medium(model, name):
+    spec = DERIVED_MEDIA[name]
+    base = MEDIA[spec['base']]
+    if spec['rule'] == 'minimal_uptake':
+        with model:
+            model.objective = spec['objective']
+            get_compiled_medium(model, spec['base']).apply(model)
+            growth = model.slim_optimize()
+            uptake = minimal_medium(model, min_objective_value=growth)
+        if uptake is None:
+            raise ValueError(f"No minimal medium found for '{name}' on model {model.id}.")
+        return {rxn_id: lb for rxn_id, lb in base.items() if rxn_id in uptake.index and uptake[rxn_id] > 0}
+    raise ValueError(f"Unknown derivation rule '{spec['rule']}' for medium '{name}'.")
+
+def get_compiled_medium(model, name):
+    """
+    Returns the CompiledMedium for a registry name on this model, compiling it on first use. ValueError if the name is not a medium (see check_dm).
+    """
+    check_dm(name)
+    cache = _compiled.setdefault(model, {})
+    compiled = cache.get(name)
+    if compiled is None or not same_reactions(compiled.token, model):
+        if name in MEDIA:
+            composition = MEDIA[name]
+        else:
+            composition = _derive_medium(model, name)
+        compiled = CompiledMedium(model, name, composition)
+        cache[name] = compiled
+    return compiled
 
 def set_dm(model, dm):
     """
@@ -6,16 +306,17 @@ def set_dm(model, dm):
 
     Args:
         model (Cobra model): base CB model to constrain
-        dm (str): media series formulation to set. Options: '57', '25', '16', 13' 
+        dm (str): media formulation to set. Options: '57', '25', '16', '13', 'sun', 'model_min' or any name added with register_medium
     Returns: 
         model (Cobra model): media-constrained CB model 
         media (dict): dictionary of exchanges set. Keys= cobra reaction object for each reaction in DM. Values: LB corresponding to concentration
 
     Notes:
         - All formulations are set in the same way: 
-            1. Media conditions are defined based on formulation selected in arg DM 
+            1. Media conditions are looked up in the MEDIA registry (or derived, see DERIVED_MEDIA) and compiled once per model into exchange positions and lower bounds
             2. All model exchange reactions are closed to LB=0 
-            3. Iterative and controlled opening of media-specific exchanges based on formulation selected in arg DM 
+            3. Media-specific exchanges are opened to the registry lower bounds
+          Steps 2 and 3 are one update: only exchanges whose lower bound actually changes are touched
         -Returns model, media as tuple 
         -Echos DM formulation selected when a proper argument is passed. Also provides ValueError if an invalid DM str is passed. 
         - import: from set_DMs import set_dm
@@ -23,169 +324,33 @@ def set_dm(model, dm):
         - Concentrations of DM components are relative uptake rates, glucose = -10 
         - Cobrapy Version: 0.29.1, Python Version: 3.9.12
     """
-    valid_dms = ['57', '25', '16', '13']
-    if dm not in valid_dms:
-        raise ValueError(f"Invalid DM '{dm}' passed. Must be one of {valid_dms}.")
-    
-    if dm == '57': 
-        #Step 1: Media conditions are defined based on formulation selected in arg DM 
-        media={model.exchanges.EX_4abut_e: -0.238239650186896,
-model.exchanges.EX_adn_e: -0.909023633807176,
-model.exchanges.EX_ala_L_e: -3.43941818181818,
-model.exchanges.EX_arg_L_e: -0.282058240267196,
-model.exchanges.EX_asn_L_e: -0.0929733300305507,
-model.exchanges.EX_asp_L_e: -0.55373266853357,
-model.exchanges.EX_btn_e: -0.502788930606048,
-model.exchanges.EX_C00072_e: -0.697458344517168,
-model.exchanges.EX_cbl1_e: -0.00906293953948838,
-model.exchanges.EX_cit_e: -2.17226868802977,
-model.exchanges.EX_cobalt2_e: -0.710036784025223,
-model.exchanges.EX_csn_e: -0.44225513460437,
-model.exchanges.EX_cu2_e: -0.000983950365558824,
-model.exchanges.EX_cys_L_e: -1.16893013200794,
-model.exchanges.EX_cytd_e: -0.101009685701545,
-model.exchanges.EX_fe2_e: -0.0323445102064021,
-model.exchanges.EX_fol_e: -0.000556576183218685,
-model.exchanges.EX_glc_D_e: -10,
-model.exchanges.EX_glu_L_e: -0.500929913558201,
-model.exchanges.EX_gly_e: -0.837744,
-model.exchanges.EX_gua_e: -0.487671661363185,
-model.exchanges.EX_his_L_e: -0.65449154972054,
-model.exchanges.EX_ile_L_e: -0.468006545454545,
-model.exchanges.EX_inost_e: -0.00681833698681884,
-model.exchanges.EX_k_e: -19.7463439075564,
-model.exchanges.EX_leu_L_e: -0.468006545454545,
-model.exchanges.EX_lys_L_e: -0.881965090909091,
-model.exchanges.EX_met_L_e: -0.164648969420768,
-model.exchanges.EX_mg2_e: -5.10261883074804,
-model.exchanges.EX_mn2_e: -0.0221638272953635,
-model.exchanges.EX_mops_e: -9.82706405984726,
-model.exchanges.EX_na1_e: -0.0840769087175658,
-model.exchanges.EX_nac_e: -0.0402313481163887,
-model.exchanges.EX_NH4_e: -7.08581509092581,
-model.exchanges.EX_phe_L_e: -0.371702836363636,
-model.exchanges.EX_pnto_R_e: -0.00515545143585351,
-model.exchanges.EX_pro_L_e: -0.426767062628509,
-model.exchanges.EX_pydx_e: -0.0120652552437249,
-model.exchanges.EX_ribflv_e: -0.0130548864158699,
-model.exchanges.EX_ser_L_e: -1.81153897697883,
-model.exchanges.EX_thm_e: -0.185161838463014,
-model.exchanges.EX_thr_L_e: -0.515417920291105,
-model.exchanges.EX_thym_e: -0.0584424852762019,
-model.exchanges.EX_trp_L_e: -0.336817309090909,
-model.exchanges.EX_tyr_L_e: -0.271098358335077,
-model.exchanges.EX_ura_e: -0.00438361724922243,
-model.exchanges.EX_val_L_e: -0.209711414000006,
-model.exchanges.EX_xan_e: -0.0193811894502184,
-model.exchanges.EX_zn2_e: -0.00854216715134657,
-model.exchanges.EX_pi_e: -19.7463439075564,
-model.exchanges.EX_h_e: -0.0120652552437249,
-model.exchanges.EX_hco3_e:-1}
-        #Step 2: All model exchange reactions are closed to LB=0 
-        for q in model.reactions: 
-            if "EX_" in q.id: 
-                q.lower_bound=0
-        #Step 3: Iterative and controlled opening of media-specific exchanges
-        for name, concentration in media.items(): 
-            name.lower_bound=concentration
-        print("dm57 set")
-        return model,media
-    
-    elif dm == '25': 
-        #Step 1: Media conditions are defined based on formulation selected in arg DM 
-        media={
-model.exchanges.EX_arg_L_e: -0.282058240267196,
-model.exchanges.EX_asn_L_e: -0.0929733300305507,
-model.exchanges.EX_asp_L_e: -0.55373266853357,
-model.exchanges.EX_C00072_e: -0.697458344517168,
-model.exchanges.EX_cit_e: -2.17226868802977,
-model.exchanges.EX_cobalt2_e: -0.710036784025223,
-model.exchanges.EX_cys_L_e: -1.16893013200794,
-model.exchanges.EX_cytd_e: -0.101009685701545,
-model.exchanges.EX_glc_D_e: -10,
-model.exchanges.EX_glu_L_e: -0.500929913558201,
-model.exchanges.EX_his_L_e: -0.65449154972054,
-model.exchanges.EX_ile_L_e: -0.468006545454545,
-model.exchanges.EX_k_e: -19.7463439075564,
-model.exchanges.EX_met_L_e: -0.164648969420768,
-model.exchanges.EX_mg2_e: -5.10261883074804,
-model.exchanges.EX_mops_e: -9.82706405984726,
-model.exchanges.EX_NH4_e: -7.08581509092581,
-model.exchanges.EX_pro_L_e: -0.426767062628509,
-model.exchanges.EX_ser_L_e: -1.81153897697883,
-model.exchanges.EX_ura_e: -0.00438361724922243,
-model.exchanges.EX_val_L_e: -0.209711414000006,
-model.exchanges.EX_xan_e: -0.0193811894502184,
-model.exchanges.EX_pi_e: -19.7463439075564,
-model.exchanges.EX_h_e: -0.0120652552437249,
-model.exchanges.EX_hco3_e:-1}
-        #Step 2: All model exchange reactions are closed to LB=0 
-        for q in model.reactions: 
-            if "EX_" in q.id: 
-                q.lower_bound=0
-        #Step 3: Iterative and controlled opening of media-specific exchanges
-        for name, concentration in media.items(): 
-            name.lower_bound=concentration
-        print("dm25 set")
-        return model,media
-    
-    elif dm == '16':
-        #Step 1: Media conditions are defined based on formulation selected in arg DM 
-        media={
-model.exchanges.EX_arg_L_e: -0.282058240267196,
-model.exchanges.EX_asn_L_e: -0.0929733300305507,
-model.exchanges.EX_asp_L_e: -0.55373266853357,
-model.exchanges.EX_cobalt2_e: -0.710036784025223,
-model.exchanges.EX_cys_L_e: -1.16893013200794,
-model.exchanges.EX_cytd_e: -0.101009685701545,
-model.exchanges.EX_glc_D_e: -10,
-model.exchanges.EX_glu_L_e: -0.500929913558201,
-model.exchanges.EX_his_L_e: -0.65449154972054,
-model.exchanges.EX_ile_L_e: -0.468006545454545,
-model.exchanges.EX_k_e: -19.7463439075564,
-model.exchanges.EX_mg2_e: -5.10261883074804,
-model.exchanges.EX_mops_e: -9.82706405984726,
-model.exchanges.EX_NH4_e: -7.08581509092581,
-model.exchanges.EX_pro_L_e: -0.426767062628509,
-model.exchanges.EX_val_L_e: -0.209711414000006,
-model.exchanges.EX_pi_e: -19.7463439075564,
-model.exchanges.EX_h_e: -0.0120652552437249,
-model.exchanges.EX_hco3_e:-1}
-        #Step 2: All model exchange reactions are closed to LB=0 
-        for q in model.reactions: 
-            if "EX_" in q.id: 
-                q.lower_bound=0
-        #Step 3: Iterative and controlled opening of media-specific exchanges
-        for name, concentration in media.items(): 
-            name.lower_bound=concentration
-        print("dm16 set")
-        return model,media
-
-    elif dm == '13':
-        #Step 1: Media conditions are defined based on formulation selected in arg DM 
-        media={
-model.exchanges.EX_arg_L_e: -0.282058240267196,
-model.exchanges.EX_asn_L_e: -0.0929733300305507,
-model.exchanges.EX_asp_L_e: -0.55373266853357,
-model.exchanges.EX_cobalt2_e: -0.710036784025223,
-model.exchanges.EX_cys_L_e: -1.16893013200794,
-model.exchanges.EX_glc_D_e: -10,
-model.exchanges.EX_glu_L_e: -0.500929913558201,
-model.exchanges.EX_his_L_e: -0.65449154972054,
-model.exchanges.EX_ile_L_e: -0.468006545454545,
-model.exchanges.EX_k_e: -19.7463439075564,
-model.exchanges.EX_mg2_e: -5.10261883074804,
-model.exchanges.EX_pro_L_e: -0.426767062628509,
-model.exchanges.EX_val_L_e: -0.209711414000006,
-model.exchanges.EX_pi_e: -19.7463439075564,
-model.exchanges.EX_h_e: -0.0120652552437249,
-model.exchanges.EX_hco3_e:-1}
-        #Step 2: All model exchange reactions are closed to LB=0 
-        for q in model.reactions: 
-            if "EX_" in q.id: 
-                q.lower_bound=0
-        #Step 3: Iterative and controlled opening of media-specific exchanges
-        for name, concentration in media.items(): 
-            name.lower_bound=concentration
-        print("dm13 set")
-        return model,media
+    compiled = get_compiled_medium(model, dm)
+    compiled.apply(model)
+    print(f"dm{dm} set" if dm.isdigit() else f"{dm} set")
+    return model, compiled.media(model)
+
+@contextmanager
+def applied_medium(model, dm):
+    """
+    Context-managed set_dm: applies a medium on entry and restores the exchange bounds it touched on exit, so loops over media and boosters can share one model instead of calling model.copy() per condition.
+
+    Args:
+        model (Cobra model): base CB model to constrain
+        dm (str): media formulation to set, same options as set_dm
+    Yields:
+        model (Cobra model): the same model object, media-constrained
+        media (dict): Keys= cobra reaction object for each reaction in DM. Values: LB corresponding to concentration
+    Notes:
+        - Only the lower bounds of exchanges that the medium changed are snapshotted and restored. Other changes made inside the block persist unless they are also made inside a `with model:` block
+        - Does not echo the formulation, unlike set_dm, so it stays quiet inside loops
+        - example:
+            with applied_medium(model, '57') as (model57, media57):
+                results = pe_Data(model57, target='EX_lac_L_e')
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    compiled = get_compiled_medium(model, dm)
+    changed, previous = compiled.apply(model)
+    try:
+        yield model, compiled.media(model)
+    finally:
+        compiled.restore(model, changed, previous)
@@ -0,0 +1,490 @@
+import os
+import re
+import json
+import pickle
+import inspect
+import weakref
+import hashlib
+import functools
+import cobra
+import solver_hooks
+from cobra.util.solver import linear_reaction_coefficients
+
+#Cache settings. The cache is off unless IGR632_SIM_CACHE is set to a directory or enable() is called
+#   IGR632_SIM_CACHE_MB: size limit of the cache directory in MB, oldest-used entries are evicted past it
+#   IGR632_SIM_CACHE_INCREMENTAL=0: only exact model states are hits, no reuse across model versions
+#   IGR632_SIM_CACHE_STRICT=0: also reuse entries across added reactions and stoichiometry changes that share no metabolite with the entry's active network (see is_stale)
+#Incremental reuse across model versions: every entry also records the reactions that carried flux in the solves behind it (its active set)
+#   index/<call>.jsonl: the entries of one call (function and arguments, any model), with their model state and active set
+#   states/<digest>.json: per-reaction stoichiometry digest and bounds of each model state an entry was computed on
+#   On a miss, an entry of the same call on another model state is reused when none of the differences can change its result (see is_stale)
+_settings = {
+    'dir': os.environ.get('IGR632_SIM_CACHE') or None,
+    'max_bytes': int(float(os.environ.get('IGR632_SIM_CACHE_MB', 2048)) * 2**20),
+    'incremental': os.environ.get('IGR632_SIM_CACHE_INCREMENTAL', '1') != '0',
+    'strict': os.environ.get('IGR632_SIM_CACHE_STRICT', '1') != '0',
+}
+_stats = {'hits': 0, 'misses': 0, 'reused': 0}
+_size = {'bytes': None}    #running size of the stored entries, None until the first write walks the directory
+
+def enable(cache_dir="~/.cache/igr632_sim", max_mb=2048):
+    """
+    Turns the simulation cache on for this process, storing results under cache_dir with a size limit of max_mb.
+    """
+    _settings['dir'] = os.path.expanduser(cache_dir)
+    _settings['max_bytes'] = int(max_mb * 2**20)
+    _size['bytes'] = None
+    _track_versions(True)
+
+def disable():
+    """
+    Turns the simulation cache off and puts back the cobra methods it wraps (see _version). Stored entries are kept on disk.
+    """
+    _settings['dir'] = None
+    _track_versions(False)
+
+def stats():
+    """
+    Returns the number of cache hits (reused: hits served from another model state), and misses in this process.
+    """
+    return dict(_stats)
+
+#Model states are memoized per model while the cache is on. Every cobra call that can change an LP (stoichiometry, bounds, adding, removing or renaming
+#reactions, renaming metabolites) bumps _version, so while it and the objective and solver constraints are unchanged, a model's state is served from _memo
+#without hashing the reactions again. Stoichiometry digests are also kept per reaction until a stoichiometry changes anywhere.
+#The cobra methods are only wrapped between enable() and disable(), with the cache off model_state hashes the model on every call.
+#Changes made directly on solver variables (rxn.forward_variable.lb = ...) bypass cobra and are not seen, set bounds through the reaction instead
+_version = {'any': 0, 'stoichiometry': 0, 'tracking': False}
+_memo = weakref.WeakKeyDictionary()
+_VERSIONED = ((cobra.Reaction, 'add_metabolites', True), (cobra.Reaction, 'update_variable_bounds', False),
+              (cobra.Reaction, '_set_id_with_model', False), (cobra.Metabolite, '_set_id_with_model', True),
+              (cobra.Model, 'add_reactions', False), (cobra.Model, 'remove_reactions', False))
+
+def _bumps_version(method, stoichiometry=False):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        _version['any'] += 1
+        if stoichiometry:
+            _version['stoichiometry'] += 1
+        return method(*args, **kwargs)
+    wrapper._wrapped_by_sim_cache = method
+    return wrapper
+
+def _track_versions(on):
+    #Wraps (on) or unwraps the cobra methods that bump _version. Memos are dropped both ways: changes made in between were not counted
+    if on == _version['tracking']:
+        return
+    for cls, name, stoichiometry in _VERSIONED:
+        method = cls.__dict__[name]
+        if on:
+            setattr(cls, name, _bumps_version(method, stoichiometry))
+        elif hasattr(method, '_wrapped_by_sim_cache'):
+            setattr(cls, name, method._wrapped_by_sim_cache)
+    _version['tracking'] = on
+    _memo.clear()
+
+def _stoichiometry_digest(rxn):
+    return hashlib.sha256(";".join(f"{met.id}:{coef!r}" for met, coef in sorted(rxn._metabolites.items(), key=lambda item: item[0].id)).encode()).hexdigest()[:16]
+
+def _extra_constraints(model):
+    #Solver constraints that are not metabolite mass balances (e.g. added by pfba or loopless)
+    if len(model.solver.constraints) == len(model.metabolites):
+        return []
+    return [c for c in model.solver.constraints if c.name not in model.metabolites]
+
+def _token(model):
+    #Cheap summary of what can change without going through the cobra methods that bump _version
+    objective = model.solver.objective
+    extras = tuple((c.name, c.lb, c.ub, str(c.expression)) for c in _extra_constraints(model))
+    return (_version['any'], id(model.solver), id(objective), objective.direction, str(objective.expression), model.tolerance,
+            len(model.solver.variables), extras)
+
+def _fingerprint(model):
+    #Memo entry of the model's current state: 'digest' and 'global' always, 'reactions' (the per-reaction map) only once model_state asked for it
+    token = _token(model) if _version['tracking'] else None
+    memo = _memo.get(model)
+    if memo is not None and memo['token'] == token:
+        return memo
+    #reaction ID -> (id of the Reaction object, stoichiometry digest). Object ids, not the objects, so the memo does not keep the model alive
+    if memo is not None and memo['stoichiometry_version'] == _version['stoichiometry']:
+        stoichiometry = memo['stoichiometry']
+    else:
+        stoichiometry = {}
+    g = hashlib.sha256()
+    coefficients = linear_reaction_coefficients(model)
+    g.update(";".join(f"{rxn.id}:{coef!r}" for rxn, coef in sorted(coefficients.items(), key=lambda item: item[0].id)).encode())
+    g.update(f"|{model.solver.objective.direction}|{model.solver.interface.__name__}|{model.tolerance!r}\n".encode())
+    for constraint in _extra_constraints(model):
+        g.update(f"{constraint.name}|{constraint.lb!r}|{constraint.ub!r}|{constraint.expression}\n".encode())
+    global_digest = g.hexdigest()
+    lines = []
+    for rxn in model.reactions:
+        known = stoichiometry.get(rxn.id)
+        if known is None or known[0] != id(rxn):
+            known = stoichiometry[rxn.id] = (id(rxn), _stoichiometry_digest(rxn))
+        lines.append(f"{rxn.id}|{rxn.lower_bound!r}|{rxn.upper_bound!r}|{known[1]}\n")
+    digest = hashlib.sha256((global_digest + "".join(lines)).encode()).hexdigest()
+    memo = {'token': token, 'digest': digest, 'global': global_digest, 'reactions': None,
+            'stoichiometry': stoichiometry, 'stoichiometry_version': _version['stoichiometry']}
+    if token is not None:
+        _memo[model] = memo
+    return memo
+
+def model_state(model):
+    """
+    Fingerprints everything that determines an LP result on a cobra model, globally and per reaction.
+
+    Args:
+        model (Cobra model): CB model to fingerprint
+    Returns:
+        digest (str): sha256 hex digest of the whole state, the model part of cache keys
+        reactions (dict): reaction ID -> (stoichiometry digest, lower bound, upper bound)
+        global_digest (str): digest of the objective coefficients and direction, the solver interface, model.tolerance and any solver constraints that are not metabolite mass balances (e.g. added by pfba or loopless)
+    Notes:
+        - Reaction names, GPRs and annotations do not change results and are left out
+        - While the cache is on, memoized per model until one of its reactions, bounds, objective or solver constraints changes. Stoichiometry digests are kept per reaction until a stoichiometry changes. With the cache off every call hashes the model
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    memo = _fingerprint(model)
+    if memo['reactions'] is None:
+        stoichiometry = memo['stoichiometry']
+        memo['reactions'] = {rxn.id: (stoichiometry[rxn.id][1], rxn.lower_bound, rxn.upper_bound) for rxn in model.reactions}
+    return memo['digest'], memo['reactions'], memo['global']
+
+def model_digest(model):
+    """
+    Hashes everything that determines an LP result on a cobra model (the digest of model_state).
+    """
+    return _fingerprint(model)['digest']
+
+def _normalize(value):
+    #Cobra objects are keyed by ID, containers element by element
+    if hasattr(value, 'id') and not isinstance(value, (str, bytes)):
+        return value.id
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return sorted((_normalize(k), _normalize(v)) for k, v in value.items())
+    return value
+
+def call_repr(func_name, args, kwargs):
+    """
+    Returns the model-independent part of a cache key: the function name and its normalized arguments.
+    """
+    return repr((func_name, _normalize(list(args)), _normalize(kwargs)))
+
+def cache_key(func_name, model, args, kwargs, digest=None):
+    """
+    Returns the cache key of a call: the model digest plus the function name and its normalized arguments.
+    """
+    digest = model_digest(model) if digest is None else digest
+    return hashlib.sha256(f"{digest}|{call_repr(func_name, args, kwargs)}".encode()).hexdigest()
+
+def _path(key):
+    return os.path.join(_settings['dir'], key[:2], key + ".pkl")
+
+def _load(key):
+    path = _path(key)
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None, False
+    os.utime(path)    #mark as recently used for eviction
+    return value, True
+
+def _store(key, value):
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    if _size['bytes'] is None:
+        _size['bytes'] = _entry_bytes()
+    try:
+        _size['bytes'] -= os.path.getsize(path)
+    except OSError:
+        pass
+    os.replace(tmp, path)    #atomic, so parallel workers never read half-written entries
+    _size['bytes'] += os.path.getsize(path)
+    if _size['bytes'] > _settings['max_bytes']:    #the directory is only walked when the running total passes the limit
+        evict(_settings['max_bytes'])
+
+def _entries_on_disk():
+    entries = []
+    for root, dirs, files in os.walk(_settings['dir']):
+        for name in files:
+            if name.endswith(".pkl"):
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, os.path.join(root, name)))
+    return entries
+
+def _entry_bytes():
+    return sum(size for _, size, _ in _entries_on_disk())
+
+def evict(max_bytes=None):
+    """
+    Deletes least recently used entries until the cache directory is under max_bytes (default: the configured limit).
+    """
+    if _settings['dir'] is None or not os.path.isdir(_settings['dir']):
+        return
+    max_bytes = _settings['max_bytes'] if max_bytes is None else max_bytes
+    entries = _entries_on_disk()
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+    _size['bytes'] = total    #also picks up what other processes wrote since the last walk
+
+def cached(func=None, ignore=()):
+    """
+    Decorator for simulation functions whose first argument is a cobra model: results are stored on disk keyed by the model content and the call arguments.
+
+    Args:
+        func (function): function to wrap, called as func(model, *args, **kwargs)
+        ignore (tuple): keyword arguments left out of the key because they do not change the result, e.g. 'processes'
+    Returns:
+        wrapper (function): same signature as func
+    Notes:
+        - Does nothing unless the cache is enabled (IGR632_SIM_CACHE or enable())
+        - The key hashes the model at call time (see model_digest), so any change to bounds, media, objective or reactions is a different entry. Nothing has to be invalidated by hand
+        - Arguments are bound to func's signature with defaults applied, so f(m, 'x'), f(m, objective='x') and f(m) with objective='x' as default share one entry
+        - Old entries are evicted when the running size of the writes passes the limit, not on every write
+        - A miss on a new model version can still be served by the entry of an older version when the only changes are bound tightenings and removals outside the entry's active set that keep zero flux feasible (see is_stale and model_diff), so after such a curation step only the affected simulations re-run. Added reactions and stoichiometry changes always re-run unless IGR632_SIM_CACHE_STRICT=0
+        - The model state is memoized per model and recomputed only after a change (see _version), so a hit costs one small digest lookup, not a pass over the model
+        - Results come back as fresh unpickled objects on a hit, and no solver call is made
+        - example:
+            @cached
+            def fba(model, objective='curated_biomass'): ...
+        - Cobrapy Version: 0.29.1, Python Version: 3.9.12
+    """
+    if func is None:
+        return lambda f: cached(f, ignore=ignore)
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(model, *args, **kwargs):
+        if _settings['dir'] is None:
+            return func(model, *args, **kwargs)
+        bound = signature.bind(model, *args, **kwargs)
+        bound.apply_defaults()
+        keyed = {k: v for i, (k, v) in enumerate(bound.arguments.items()) if i > 0 and k not in ignore}
+        func_name = f"{func.__module__}.{func.__qualname__}"
+        call = call_repr(func_name, (), keyed)
+        key = hashlib.sha256(f"{model_digest(model)}|{call}".encode()).hexdigest()
+        value, hit = _load(key)
+        state = None
+        if not hit:
+            state = model_state(model)    #the per-reaction map is only needed on a miss
+            value, hit = _reuse(model, key, call, state)
+        if hit:
+            _stats['hits'] += 1
+            if _recorders:    #an enclosing cached call inherits the active set of this one
+                active = _active_of(key, call)
+                for recorder in _recorders:
+                    recorder |= active
+            return value
+        _stats['misses'] += 1
+        with _recording() as active:
+            value = func(model, *args, **kwargs)
+        active |= _result_active(value)
+        _store(key, value)
+        _index(key, func_name, call, model_state(model) if state is None else state, active)
+        return value
+    return wrapper
+
+#Active set recording: while a cached function runs, the variables with a nonzero primal value after each optimal solve are collected
+_recorders = []
+_reverse_suffix = re.compile(r'_reverse_[0-9a-f]{5}$')
+
+def _recording_optimize(self, solve):
+    status = solve(self)
+    if _recorders and status == 'optimal':
+        active = {_reverse_suffix.sub('', name) for name, value in self.primal_values.items() if value != 0}
+        for recorder in _recorders:
+            recorder |= active
+    return status
+
+class _recording:
+    #The solver hook is registered while the outermost recording runs, in the hook chain shared with sim_trace (see solver_hooks), so either can be turned on or off inside the other
+    def __enter__(self):
+        if not _recorders:
+            solver_hooks.register('sim_cache', _recording_optimize)
+        self.active = set()
+        _recorders.append(self.active)
+        return self.active
+
+    def __exit__(self, *exc):
+        _recorders.remove(self.active)
+        if not _recorders:
+            solver_hooks.unregister('sim_cache')
+        return False
+
+def _result_active(value):
+    #Reactions carrying flux according to the result itself, for solves the hook cannot see (e.g. FVA worker processes)
+    if hasattr(value, 'active_reactions'):    #results that know their own active set, e.g. FluxSnapshots
+        return set(value.active_reactions())
+    fluxes = getattr(value, 'fluxes', None)
+    if fluxes is not None:
+        return set(fluxes.index[fluxes != 0])
+    columns = getattr(value, 'columns', None)
+    if columns is not None and 'minimum' in columns and 'maximum' in columns:
+        return set(value.index[(value['minimum'] != 0) | (value['maximum'] != 0)])
+    return set()
+
+def _call_hash(call):
+    return hashlib.sha256(call.encode()).hexdigest()[:32]
+
+def _index(key, func_name, call, state, active):
+    digest, reactions, global_digest = state
+    state_path = os.path.join(_settings['dir'], 'states', digest + ".json")
+    if not os.path.exists(state_path):
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        tmp = f"{state_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(reactions, f)
+        os.replace(tmp, state_path)
+    index_path = os.path.join(_settings['dir'], 'index', _call_hash(call) + ".jsonl")
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    record = {'key': key, 'func': func_name, 'call': call, 'state': digest, 'global': global_digest, 'active': sorted(active)}
+    with open(index_path, 'a') as f:
+        f.write(json.dumps(record) + "\n")    #one short append per entry, safe for parallel workers
+
+#Index files are append-only, so each process keeps the records it has read and only reads what was appended since
+_index_records = {}
+
+def _records(call):
+    index_path = os.path.join(_settings['dir'], 'index', _call_hash(call) + ".jsonl")
+    offset, records = _index_records.get(index_path, (0, []))
+    try:
+        size = os.path.getsize(index_path)
+    except OSError:
+        return []
+    if size < offset:    #index rewritten (cache directory cleared), read it again
+        offset, records = 0, []
+    if size > offset:
+        with open(index_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        complete = data.rfind(b"\n") + 1    #a line another process is still appending is read next time
+        records = records + [json.loads(line) for line in data[:complete].splitlines() if line.strip()]
+        offset += complete
+        _index_records[index_path] = (offset, records)
+    return records
+
+def _active_of(key, call):
+    active = set()
+    for record in _records(call):
+        if record['key'] == key:
+            active.update(record['active'])
+    return active
+
+def entries():
+    """
+    Yields the index records of all cache entries (key, func, call, state, global, active). Records of evicted entries are skipped.
+    """
+    if _settings['dir'] is None:
+        return
+    index_dir = os.path.join(_settings['dir'], 'index')
+    if not os.path.isdir(index_dir):
+        return
+    for name in sorted(os.listdir(index_dir)):
+        with open(os.path.join(index_dir, name)) as f:
+            for line in f:
+                record = json.loads(line)
+                if os.path.exists(_path(record['key'])):
+                    yield record
+
+def load_state(digest):
+    """
+    Returns the per-reaction state (see model_state) an entry was computed on, None if it is not stored. States are content-addressed, so recently loaded ones are kept in memory (do not modify the returned dict).
+    """
+    path = os.path.join(_settings['dir'], 'states', digest + ".json")
+    state = _states.get(path)
+    if state is None:
+        try:
+            with open(path) as f:
+                state = {rxn_id: tuple(v) for rxn_id, v in json.load(f).items()}
+        except (OSError, ValueError):
+            return None
+        if len(_states) >= 32:
+            _states.pop(next(iter(_states)))
+        _states[path] = state
+    return state
+
+_states = {}
+
+def is_stale(old, new, active, metabolites_of, strict=True):
+    """
+    Decides whether a result computed on one model state can change on another
+
+    Args:
+        old, new (dict): per-reaction states, reaction ID -> (stoichiometry digest, lower bound, upper bound)
+        active (set): reactions carrying flux in the solves behind the result
+        metabolites_of (function): reaction ID -> metabolite IDs on the new model (for reactions present there)
+        strict (bool): if True (default), any added reaction or stoichiometry change makes the result stale. False keeps results across added or changed reactions that share no metabolite with the active network
+    Returns:
+        stale (bool), reasons (list): (reaction ID, change) pairs that make it stale
+    Notes:
+        - Removing or tightening an inactive reaction only cuts away flux states the result did not use, so its optimum stays optimal: not stale. Unless the new bounds exclude zero (e.g. a lower bound raised from 0 to 5), which makes the old optimum infeasible: stale
+        - Loosening any bound can open a better optimum: always stale (this is what keeps media switches apart)
+        - Added reactions and stoichiometry changes are always stale by default. With strict=False they are only stale when the reaction is active or shares a metabolite with the active network. That misses gap-filling reactions, which join two inactive metabolites and can open an inactive pathway into the active network, so only use it when the changes are known not to do that
+    """
+    active_metabolites = None
+    reasons = []
+    for rxn_id in set(old) | set(new):
+        o, n = old.get(rxn_id), new.get(rxn_id)
+        if o == n:
+            continue
+        if n is None:
+            change = 'removed'
+            stale = rxn_id in active
+        elif o is None or o[0] != n[0]:
+            change = 'added' if o is None else 'stoichiometry'
+            if strict or rxn_id in active:
+                stale = True
+            else:
+                if active_metabolites is None:
+                    active_metabolites = set()
+                    for r in active:
+                        if r in new:
+                            active_metabolites.update(metabolites_of(r))
+                stale = not active_metabolites.isdisjoint(metabolites_of(rxn_id))
+        else:
+            tightened = n[1] >= o[1] and n[2] <= o[2]
+            change = 'tightened' if tightened else 'loosened'
+            stale = not tightened or rxn_id in active or not n[1] <= 0 <= n[2]
+        if stale:
+            reasons.append((rxn_id, change))
+    return bool(reasons), reasons
+
+def _reuse(model, key, call, state):
+    #Looks for an entry of the same call on another model state that the differences cannot change. A reused value is stored under the new key too
+    if not _settings['incremental']:
+        return None, False
+    digest, reactions, global_digest = state
+    metabolites_of = lambda rxn_id: [met.id for met in model.reactions.get_by_id(rxn_id).metabolites]
+    for record in reversed(_records(call)):    #newest first
+        if record['call'] != call or record['global'] != global_digest:
+            continue
+        old = load_state(record['state'])
+        if old is None or is_stale(old, reactions, set(record['active']), metabolites_of, _settings['strict'])[0]:
+            continue
+        value, hit = _load(record['key'])
+        if hit:
+            _stats['reused'] += 1
+            _store(key, value)
+            _index(key, record['func'], call, state, set(record['active']))
+            return value, True
+    return None, False
+
+if _settings['dir'] is not None:
+    _track_versions(True)
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+from contextlib import contextmanager
+import solver_hooks
+
+#Tracing is off unless IGR632_SIM_TRACE is set to an output path or enable() is called
+#   IGR632_SIM_TRACE=trace.json writes a Chrome trace (chrome://tracing, Perfetto) when the script exits, a path ending in .jsonl writes one event per line instead
+#   '{pid}' in the path is replaced by the process ID, so worker processes of condition_grid write their own files
+_state = {'enabled': False, 'events': [], 'stack': []}
+_t0 = time.perf_counter()
+
+def _now_us():
+    return (time.perf_counter() - _t0) * 1e6
+
+def enable():
+    """
+    Starts recording traced calls and every LP solve made in this process.
+    """
+    if _state['enabled']:
+        return
+    _state['enabled'] = True
+    solver_hooks.register('sim_trace', _traced_optimize)
+
+def disable():
+    """
+    Stops recording. Events recorded so far are kept until clear().
+    """
+    if not _state['enabled']:
+        return
+    solver_hooks.unregister('sim_trace')
+    _state['enabled'] = False
+
+def clear():
+    """
+    Drops the recorded events.
+    """
+    _state['events'] = []
+
+def events():
+    """
+    Returns the recorded events (Chrome trace event dicts, times in microseconds).
+    """
+    return list(_state['events'])
+
+def _iterations(solver):
+    #Best effort simplex iteration count of the last solve, None when the interface does not expose it
+    interface = solver.interface.__name__
+    try:
+        if interface.endswith('glpk_interface') or interface.endswith('glpk_exact_interface'):
+            from swiglpk import glp_get_it_cnt
+            return int(glp_get_it_cnt(solver.problem))
+        if interface.endswith('gurobi_interface'):
+            return int(solver.problem.IterCount)
+        if interface.endswith('cplex_interface'):
+            return int(solver.problem.solution.progress.get_num_iterations())
+    except Exception:
+        return None
+    return None
+
+def _traced_optimize(self, solve):
+    #Solver hook (see solver_hooks) while tracing: pending model changes are flushed first and timed on their own (LP building), then the solve itself
+    start = _now_us()
+    self.update()
+    flushed = _now_us()
+    status = solve(self)
+    end = _now_us()
+    _state['events'].append({
+        'name': 'solve', 'cat': 'solve', 'ph': 'X', 'ts': start, 'dur': end - start,
+        'pid': os.getpid(), 'tid': threading.get_ident(),
+        'args': {
+            'status': status,
+            'iterations': _iterations(self),
+            'update_ms': (flushed - start) / 1e3,
+            'solve_ms': (end - flushed) / 1e3,
+            'interface': self.interface.__name__.rsplit('.', 1)[-1],
+        },
+    })
+    if _state['stack']:
+        frame = _state['stack'][-1]
+        frame['n_solves'] += 1
+        frame['solve_us'] += end - flushed
+    return status
+
+@contextmanager
+def span(name, **details):
+    """
+    Records a named region (e.g. 'model.copy') as one event, with the number of LP solves inside it and the time split into setup and solve.
+
+    Args:
+        name (str): event name
+        details: extra values stored in the event args
+    Notes:
+        - setup_ms is the span time not spent inside solver calls: model copies, bound and objective changes, LP updates and Python overhead
+        - Spans nest, and solves are counted in every enclosing span
+        - Does nothing when tracing is off
+    """
+    if not _state['enabled']:
+        yield
+        return
+    frame = {'n_solves': 0, 'solve_us': 0.0}
+    _state['stack'].append(frame)
+    start = _now_us()
+    try:
+        yield
+    finally:
+        dur = _now_us() - start
+        _state['stack'].pop()
+        if _state['stack']:
+            parent = _state['stack'][-1]
+            parent['n_solves'] += frame['n_solves']
+            parent['solve_us'] += frame['solve_us']
+        args = {'n_solves': frame['n_solves'], 'solve_ms': frame['solve_us'] / 1e3, 'setup_ms': (dur - frame['solve_us']) / 1e3}
+        args.update(details)
+        _state['events'].append({'name': name, 'cat': 'call', 'ph': 'X', 'ts': start, 'dur': dur,
+                                 'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args})
+
+def traced(func):
+    """
+    Decorator that records each call of a simulation function (fba, fva, pe_Data) as a span, see span.
+
+    Notes:
+        - The call arguments other than the model are stored in the event, shortened to 200 characters
+        - Cache hits (see sim_cache) show up as spans with no solves
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _state['enabled']:
+            return func(*args, **kwargs)
+        call = repr((args[1:], kwargs))[:200]
+        with span(func.__name__, call=call):
+            return func(*args, **kwargs)
+    return wrapper
+
+def summary():
+    """
+    Aggregates the recorded events by name.
+
+    Returns:
+        rows (dict): event name -> {'calls', 'total_ms', 'solve_ms', 'setup_ms', 'n_solves'}. For 'solve' events setup_ms is the LP update time
+    """
+    rows = {}
+    for event in _state['events']:
+        row = rows.setdefault(event['name'], {'calls': 0, 'total_ms': 0.0, 'solve_ms': 0.0, 'setup_ms': 0.0, 'n_solves': 0})
+        row['calls'] += 1
+        row['total_ms'] += event['dur'] / 1e3
+        args = event['args']
+        if event['cat'] == 'solve':
+            row['solve_ms'] += args['solve_ms']
+            row['setup_ms'] += args['update_ms']
+            row['n_solves'] += 1
+        else:
+            row['solve_ms'] += args['solve_ms']
+            row['setup_ms'] += args['setup_ms']
+            row['n_solves'] += args['n_solves']
+    return rows
+
+def export_jsonl(path):
+    """
+    Writes the recorded events as JSON lines, one event per line.
+    """
+    with open(path, 'w') as f:
+        for event in _state['events']:
+            f.write(json.dumps(event, default=str) + "\n")
+
+def export_chrome_trace(path):
+    """
+    Writes the recorded events as a Chrome trace JSON, viewable in chrome://tracing or ui.perfetto.dev.
+    """
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': _state['events'], 'displayTimeUnit': 'ms'}, f, default=str)
+
+def export(path):
+    """
+    Writes the recorded events to path: JSON lines if it ends in .jsonl, a Chrome trace otherwise. '{pid}' in path is replaced by the process ID.
+    """
+    path = path.replace('{pid}', str(os.getpid()))
+    if path.endswith('.jsonl'):
+        export_jsonl(path)
+    else:
+        export_chrome_trace(path)
+    return path
+
+if os.environ.get('IGR632_SIM_TRACE'):
+    enable()
+    atexit.register(lambda: _state['events'] and export(os.environ['IGR632_SIM_TRACE']))
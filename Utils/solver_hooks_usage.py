@@ -0,0 +1,47 @@
+import functools
+import optlang.interface
+
+#One wrapper around optlang's Model.optimize that every module observing LP solves registers into (sim_trace timing, sim_cache active sets),
+#so they can be turned on and off in any order without one of them restoring a method the other replaced
+#   A hook is called as hook(model, solve) and must call solve(model) once and return its status. Hooks run in registration order, the first registered outermost
+_hooks = {}
+_chain = {'base': None, 'solve': None}
+
+def _compose():
+    solve = _chain['base']
+    for hook in reversed(list(_hooks.values())):
+        solve = functools.partial(hook, solve=solve)
+    _chain['solve'] = solve
+
+def _chained_optimize(self):
+    return _chain['solve'](self)
+
+def register(name, hook):
+    """
+    Adds a hook around every LP solve (optlang Model.optimize) of this process, installing the shared wrapper on first use.
+
+    Args:
+        name (str): hook name, registering an existing name replaces its hook in place
+        hook (function): called as hook(model, solve=solve), must call solve(model) once and return its status
+    """
+    if _chain['base'] is None:
+        _chain['base'] = optlang.interface.Model.optimize
+        optlang.interface.Model.optimize = _chained_optimize
+    _hooks[name] = hook
+    _compose()
+
+def unregister(name):
+    """
+    Removes a hook. The original Model.optimize is put back once no hook is left, unless something else replaced it on top of the wrapper since (then the wrapper stays, as a plain pass-through).
+    """
+    if _hooks.pop(name, None) is None:
+        return
+    if not _hooks and optlang.interface.Model.optimize is _chained_optimize:
+        optlang.interface.Model.optimize = _chain['base']
+        _chain['base'] = None
+        _chain['solve'] = None
+        return
+    _compose()
+
+def registered(name):
+    return name in _hooks
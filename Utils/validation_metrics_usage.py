@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+#Labels follow the validation scripts: a fold change above the threshold is "no_effect", anything else (including NaN) is "deleterious"
+#   deleterious is the positive class: TP = deleterious in vitro and in silico
+#   excluded exchanges are components not analogous between in silico and in vitro: a deleterious in vitro / no effect in silico call on them counts as TN instead of FN
+
+def _deleterious(values, thresholds):
+    #(n_thresholds, n_values) boolean, True where value is not above the threshold. NaN compares False, so it is deleterious like in the scripts
+    values = np.asarray(values, dtype=float)
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+    return ~(values[None, :] > thresholds[:, None])
+
+def _excluded_mask(exchanges, excluded):
+    if excluded is None or exchanges is None:
+        return None
+    return np.isin(np.asarray(exchanges, dtype=object), list(excluded))
+
+def confusion_grid(iv, is_, iv_thresholds=0.8, is_thresholds=0.8, exchanges=None, excluded=None):
+    """
+    Computes the confusion matrix counts for every combination of an in vitro and an in silico threshold in one pass
+
+    Args:
+        iv (array-like): in vitro fold changes
+        is_ (array-like): in silico fold changes, same order as iv
+        iv_thresholds (float or array-like): thresholds applied to the in vitro fold changes
+        is_thresholds (float or array-like): thresholds applied to the in silico fold changes
+        exchanges (array-like): exchange IDs, same order as iv. Only needed with excluded
+        excluded (list): exchange IDs whose false negatives count as true negatives
+    Returns:
+        counts (dict): 'TN', 'FP', 'FN', 'TP' -> int arrays of shape (len(iv_thresholds), len(is_thresholds))
+    Notes:
+        - Labels are boolean matrices of thresholds x exchanges and each count is one matrix product over the exchanges, so a full grid costs about as much as a single threshold pair
+        - Same rules as the validation scripts: deleterious if the fold change is not above the threshold, NaN is deleterious, deleterious is positive
+    """
+    iv_del = _deleterious(iv, iv_thresholds).astype(np.int64)
+    is_del = _deleterious(is_, is_thresholds).astype(np.int64)
+    iv_ok, is_ok = 1 - iv_del, 1 - is_del
+    mask = _excluded_mask(exchanges, excluded)
+    if mask is None:
+        fn = iv_del @ is_ok.T
+        rescued = np.zeros_like(fn)
+    else:
+        fn = (iv_del * ~mask) @ is_ok.T
+        rescued = (iv_del * mask) @ is_ok.T
+    return {
+        'TN': iv_ok @ is_ok.T + rescued,
+        'FP': iv_ok @ is_del.T,
+        'FN': fn,
+        'TP': iv_del @ is_del.T,
+    }
+
+def _ratio(num, den):
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+def metrics(counts):
+    """
+    Computes accuracy, recall (TPR), precision, specificity and FPR from confusion counts, elementwise over any grid shape. A metric with a zero denominator is 0, as in the validation scripts.
+    """
+    tn, fp, fn, tp = counts['TN'], counts['FP'], counts['FN'], counts['TP']
+    return {
+        'accuracy': _ratio(tp + tn, tp + tn + fp + fn),
+        'recall': _ratio(tp, tp + fn),
+        'precision': _ratio(tp, tp + fp),
+        'specificity': _ratio(tn, tn + fp),
+        'fpr': _ratio(fp, fp + tn),
+    }
+
+def threshold_sweep(iv, is_, iv_thresholds, is_thresholds, exchanges=None, excluded=None):
+    """
+    Confusion counts and metrics for a grid of IV x IS thresholds as a tidy table
+
+    Returns:
+        sweep (pandas.core.frame.DataFrame): one row per threshold pair, columns iv_threshold, is_threshold, TN, FP, FN, TP, accuracy, recall, precision, specificity, fpr
+    """
+    iv_thresholds = np.atleast_1d(np.asarray(iv_thresholds, dtype=float))
+    is_thresholds = np.atleast_1d(np.asarray(is_thresholds, dtype=float))
+    counts = confusion_grid(iv, is_, iv_thresholds, is_thresholds, exchanges, excluded)
+    columns = {
+        'iv_threshold': np.repeat(iv_thresholds, len(is_thresholds)),
+        'is_threshold': np.tile(is_thresholds, len(iv_thresholds)),
+    }
+    for name, values in counts.items():
+        columns[name] = values.ravel()
+    for name, values in metrics(counts).items():
+        columns[name] = values.ravel()
+    return pd.DataFrame(columns)
+
+def _curve_thresholds(is_):
+    #Every distinct IS value is a point where a label flips, plus the ends so the curve runs from (0,0) to (1,1)
+    values = np.asarray(is_, dtype=float)
+    values = np.unique(values[~np.isnan(values)])
+    if len(values) == 0:
+        return np.array([-np.inf, np.inf])
+    return np.concatenate(([-np.inf], values, [np.inf]))
+
+def roc_curve(iv, is_, iv_threshold=0.8, exchanges=None, excluded=None):
+    """
+    ROC curve of the in silico fold change as a predictor of the in vitro call at iv_threshold, sweeping the IS threshold over every observed IS value
+
+    Returns:
+        roc (pandas.core.frame.DataFrame): is_threshold, fpr, tpr, sorted by fpr
+        auc (float): area under the curve
+    Notes:
+        - NaN in silico fold changes stay deleterious at every threshold, so the curve may not reach (0, 0)
+    """
+    thresholds = _curve_thresholds(is_)
+    counts = confusion_grid(iv, is_, iv_threshold, thresholds, exchanges, excluded)
+    m = metrics(counts)
+    roc = pd.DataFrame({'is_threshold': thresholds, 'fpr': m['fpr'][0], 'tpr': m['recall'][0]})
+    roc = roc.sort_values(['fpr', 'tpr']).reset_index(drop=True)
+    fpr, tpr = roc['fpr'].to_numpy(), roc['tpr'].to_numpy()
+    return roc, float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))    #trapezoidal rule, written out since np.trapz is deprecated in NumPy 2
+
+def pr_curve(iv, is_, iv_threshold=0.8, exchanges=None, excluded=None):
+    """
+    Precision-recall curve of the in silico fold change as a predictor of the in vitro call at iv_threshold, sweeping the IS threshold over every observed IS value
+
+    Returns:
+        pr (pandas.core.frame.DataFrame): is_threshold, recall, precision, one row per distinct point in increasing threshold order (so recall never decreases). Thresholds with no predicted positives are left out
+        average_precision (float): step-wise sum(recall[i] - recall[i-1]) * precision[i], recall[-1] = 0, as in sklearn
+    Notes:
+        - Tied IS values are one threshold, and thresholds that call no further exchange deleterious (e.g. the +inf end) give the same point and are collapsed into the lowest one
+        - Thresholds that only add in vitro no-effect exchanges keep recall and lower precision, so they add nothing to the sum: no interpolation between points
+    """
+    thresholds = _curve_thresholds(is_)
+    counts = confusion_grid(iv, is_, iv_threshold, thresholds, exchanges, excluded)
+    m = metrics(counts)
+    keep = (counts['TP'][0] + counts['FP'][0]) > 0
+    pr = pd.DataFrame({'is_threshold': thresholds[keep], 'recall': m['recall'][0][keep], 'precision': m['precision'][0][keep]})
+    pr = pr.drop_duplicates(['recall', 'precision']).reset_index(drop=True)    #thresholds are sorted, the lowest of a tied point is kept
+    recall, precision = pr['recall'].to_numpy(), pr['precision'].to_numpy()
+    average_precision = float(np.sum(np.diff(recall, prepend=0.0) * precision))
+    return pr, average_precision
+
+def classify(iv, is_, iv_threshold=0.8, is_threshold=0.8, exchanges=None, excluded=None):
+    """
+    Labels each exchange TP, FN, TN or FP at one threshold pair, same rules as confusion_grid. Returns a numpy array of labels in input order.
+    """
+    iv_del = _deleterious(iv, iv_threshold)[0]
+    is_del = _deleterious(is_, is_threshold)[0]
+    mask = _excluded_mask(exchanges, excluded)
+    if mask is None:
+        mask = np.zeros(len(iv_del), dtype=bool)
+    return np.select(
+        [iv_del & is_del, iv_del & ~is_del & ~mask, ~iv_del & is_del],
+        ['TP', 'FN', 'FP'],
+        default='TN',
+    )
@@ -6,12 +6,18 @@
         #Fits 2 Gaussian distributions
         # find_gaussian_intersection identifies the intersection point and assigns a confidence score to the intersection
         #plots the distribution, the 2 distributions, and lists the threshold and confidenc escore 
+#   Step 3 (bootstrap mode, BOOTSTRAP > 0): refit the mixture on BOOTSTRAP resamples of the fold changes of each medium and of all media combined
+        # resamples are split into chunks fitted across a worker pool, each fit uses the default k-means initialization with its own random state (starting from the full-data fit would pull the refits towards it and narrow the interval)
+        # intersections and separation confidences of all resamples are computed at once (gaussian_intersections, overlap_confidence, vectorized over resamples)
+        # the threshold distribution is saved to csv and summarized as a percentile confidence interval per medium
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
 from sklearn.mixture import GaussianMixture
 from scipy.stats import norm
+from data_loader import read_excel_cached
 
 def find_gaussian_intersection(m1, s1, w1, m2, s2, w2):
     a = 1/(2*s1**2) - 1/(2*s2**2)
@@ -70,6 +76,142 @@ def plot_gmm_histogram(data, title, filename=None):
     
     return threshold, confidence
 
-df = pd.read_excel('iv_fc_paper.xlsx', index_col=0)
-combined_data = df.melt(var_name='Treatment', value_name='Value')['Value']
-plot_gmm_histogram(combined_data, "Combined DM Dropouts (DM57, DM25, DM18, DM16, DM13)", filename='combined_gmm_hist_final.svg')
+def gaussian_intersections(m1, s1, w1, m2, s2, w2):
+    """
+    Vectorized find_gaussian_intersection: arrays of mixture parameters (one entry per fit) -> the intersection between the two means of each fit, NaN where there is none.
+    """
+    m1, s1, w1, m2, s2, w2 = (np.asarray(v, dtype=float) for v in (m1, s1, w1, m2, s2, w2))
+    a = 1/(2*s1**2) - 1/(2*s2**2)
+    b = m2/(s2**2) - m1/(s1**2)
+    c = (m1**2)/(2*s1**2) - (m2**2)/(2*s2**2) + np.log((s2*w1)/(s1*w2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sqrt_disc = np.sqrt(b**2 - 4*a*c)
+        linear = np.abs(a) < 1e-12    #equal variances: one root
+        r1 = np.where(linear, -c/b, (-b + sqrt_disc)/(2*a))
+        r2 = np.where(linear, np.nan, (-b - sqrt_disc)/(2*a))
+    lo, hi = np.minimum(m1, m2), np.maximum(m1, m2)
+    in1 = (r1 > lo) & (r1 < hi)
+    in2 = (r2 > lo) & (r2 < hi)
+    return np.where(in1, r1, np.where(in2, r2, np.nan))
+
+def overlap_confidence(means, stds, weights, lower, upper, n_points=1000, chunk_size=256):
+    """
+    1 - overlap area of the two weighted components for each fit, as in plot_gmm_histogram. means, stds, weights are (n_fits, 2) arrays, lower/upper the data range of each fit.
+    Fits are evaluated chunk_size at a time, so the (fits, 2, n_points) density grid stays small.
+    """
+    lower = np.broadcast_to(np.atleast_1d(lower), (len(means),))
+    upper = np.broadcast_to(np.atleast_1d(upper), (len(means),))
+    out = np.empty(len(means))
+    for start in range(0, len(means), chunk_size):
+        part = slice(start, start + chunk_size)
+        x = np.linspace(lower[part], upper[part], n_points, axis=-1)    #(chunk, n_points)
+        pdf = weights[part, :, None] * norm.pdf(x[:, None, :], means[part, :, None], stds[part, :, None])
+        out[part] = 1 - np.trapz(pdf.min(axis=1), x, axis=-1)
+    return out
+
+def fit_gmm(values, init=None, random_state=42):
+    """
+    Fits the two-component mixture and returns means, stds and weights sorted by mean. init (means, stds, weights) starts EM from a previous fit, otherwise the default k-means initialization with random_state is used.
+    """
+    if init is None:
+        gmm = GaussianMixture(n_components=2, random_state=random_state)
+    else:
+        means, stds, weights = init
+        gmm = GaussianMixture(n_components=2, random_state=random_state, means_init=means.reshape(-1, 1),
+                              weights_init=weights, precisions_init=(1/stds**2).reshape(-1, 1, 1))
+    gmm.fit(values.reshape(-1, 1))
+    means = gmm.means_.flatten()
+    order = np.argsort(means)
+    return means[order], np.sqrt(gmm.covariances_.flatten())[order], gmm.weights_[order]
+
+def _bootstrap_chunk(args):
+    #Fits one chunk of resamples, each with its own initialization seed. Returns (n, 8): means, stds, weights, min and max of each resample, NaN rows for fits that fail
+    values, n, seed = args
+    rng = np.random.default_rng(seed)
+    samples = values[rng.integers(0, len(values), size=(n, len(values)))]
+    states = rng.integers(0, 2**31 - 1, size=n)
+    out = np.full((n, 8), np.nan)
+    for i, sample in enumerate(samples):
+        try:
+            means, stds, weights = fit_gmm(sample, random_state=int(states[i]))
+        except ValueError:
+            continue
+        out[i] = np.concatenate((means, stds, weights, [sample.min(), sample.max()]))
+    return out
+
+def bootstrap_thresholds(datasets, n_boot=2000, processes=None, seed=42, chunk_size=100):
+    """
+    Bootstrap distribution of the GMM threshold for several datasets (e.g. each medium and all media combined)
+
+    Args:
+        datasets (dict): name -> fold changes (pandas Series or array, NaN dropped)
+        n_boot (int): number of resamples per dataset
+        processes (int): number of worker processes. Default None uses all cores, 1 runs in this process
+        seed (int): seed of the resampling, results are reproducible for the same seed, n_boot and chunk_size whatever the number of processes
+        chunk_size (int): resamples per worker task
+    Returns:
+        boot (pandas.core.frame.DataFrame): one row per resample, columns 'dataset', 'threshold' (NaN if the components do not intersect between their means) and 'confidence'
+        full (dict): name -> (threshold, confidence) of the fit on all data
+    Notes:
+        - Datasets with fewer than 10 values are left out, as in plot_gmm_histogram
+        - Every resample is fitted from scratch (k-means initialization, one random state per resample drawn from seed), like the full-data fit. Starting the refits from the full-data solution would bias them towards it and make the interval too narrow
+        - The mixtures are fitted in the workers, the intersections and overlaps of all resamples are computed in one vectorized step afterwards
+    """
+    values = {name: np.asarray(data, dtype=float) for name, data in datasets.items()}
+    values = {name: v[~np.isnan(v)] for name, v in values.items()}
+    values = {name: v for name, v in values.items() if len(v) >= 10}    #same minimum as plot_gmm_histogram
+    full, jobs = {}, []
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(values) * (-(-n_boot // chunk_size))))
+    for name, v in values.items():
+        means, stds, weights = fit_gmm(v)
+        full[name] = (gaussian_intersections(means[0], stds[0], weights[0], means[1], stds[1], weights[1]).item(),
+                      overlap_confidence(means[None], stds[None], weights[None], v.min(), v.max()).item())
+        for start in range(0, n_boot, chunk_size):
+            jobs.append((name, (v, min(chunk_size, n_boot - start), next(seeds))))
+    if processes == 1:
+        chunks = [_bootstrap_chunk(args) for _, args in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, [args for _, args in jobs]))
+    params = np.vstack(chunks)
+    names = np.concatenate([[name] * len(chunk) for (name, _), chunk in zip(jobs, chunks)])
+    means, stds, weights = params[:, 0:2], params[:, 2:4], params[:, 4:6]
+    thresholds = gaussian_intersections(means[:, 0], stds[:, 0], weights[:, 0], means[:, 1], stds[:, 1], weights[:, 1])
+    confidence = overlap_confidence(means, stds, weights, params[:, 6], params[:, 7])
+    boot = pd.DataFrame({'dataset': names, 'threshold': thresholds, 'confidence': confidence})
+    return boot, full
+
+def summarize_bootstrap(boot, full, ci=0.95):
+    """
+    Per-dataset threshold summary: full-data threshold and confidence, bootstrap mean, median, percentile CI and the fraction of resamples without an intersection.
+    """
+    alpha = (1 - ci) / 2
+    grouped = boot.groupby('dataset', sort=False)
+    summary = pd.DataFrame({
+        'threshold': {name: t for name, (t, _) in full.items()},
+        'confidence': {name: c for name, (_, c) in full.items()},
+        'boot_mean': grouped['threshold'].mean(),
+        'boot_median': grouped['threshold'].median(),
+        'ci_low': grouped['threshold'].quantile(alpha),
+        'ci_high': grouped['threshold'].quantile(1 - alpha),
+        'no_intersection': grouped['threshold'].apply(lambda t: t.isna().mean()),
+        'n_boot': grouped.size(),
+    })
+    summary.index.name = 'dataset'
+    return summary
+
+BOOTSTRAP = 2000    # resamples per medium, 0 skips the bootstrap
+CI = 0.95
+
+if __name__ == "__main__":
+    df = read_excel_cached('iv_fc_paper.xlsx', index_col=0)
+    combined_data = df.melt(var_name='Treatment', value_name='Value')['Value']
+    plot_gmm_histogram(combined_data, "Combined DM Dropouts (DM57, DM25, DM18, DM16, DM13)", filename='combined_gmm_hist_final.svg')
+    if BOOTSTRAP:
+        datasets = {str(c): df[c] for c in df.columns}
+        datasets['combined'] = combined_data
+        boot, full = bootstrap_thresholds(datasets, n_boot=BOOTSTRAP)
+        summary = summarize_bootstrap(boot, full, ci=CI)
+        print(summary.round(3))
+        boot.to_csv('gmm_threshold_bootstrap.csv', index=False)
+        summary.to_csv('gmm_threshold_bootstrap_summary.csv')
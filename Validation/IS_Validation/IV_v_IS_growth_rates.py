@@ -1,14 +1,23 @@
 ################ Comparing in silico and in vitro LGG growth rates in various DMs ################
-# This script hard codes the growth rates from both in vitro data (IV) and the IS data from the full media control in the the DO simulations
+# This script hard codes the growth rates from the in vitro data (IV). The IS data from the full media control in the the DO simulations is read from the results store (full_growth per model and medium)
+# AGORA and MERLIN growth rates are written to the store by cross_model_validation.py. Model/medium pairs missing from the store fall back to the published values in IS_data
 
 import matplotlib.pyplot as plt
 import numpy as np
+from results_store import read_table
+
+STORE = 'validation_store'
 
 models=["iGR632", "AGORA", "MERLIN"]
 IS_data={"DM57": [0.428, 0.0, 0.0],
       "DM25": [0.313, 0.0, 0.0],
       "DM16": [0.134, 0.0, 0.0],
       "DM13": [0.134, 0.0, 0.0]}
+stored = read_table(STORE, 'metrics', media=[m[2:] for m in IS_data], columns=['full_growth'])
+if stored is not None:
+    for _, row in stored.iterrows():
+        if row['model'] in models:
+            IS_data["DM" + row['medium']][models.index(row['model'])] = float(row['full_growth'])
 
 IV_data={"DM57": [0.224,0.214,0.226,0.219,0.227,0.22,0.23,0.234,0.251,0.233,0.231,0.227,0.215,0.21,0.221,0.218,0.214,0.178,0.236,0.246,0.248,0.236,0.228,0.256],
       "DM25": [0.276,0.276,0.296,0.278,0.273,0.268,0.275,0.287,0.409,0.289,0.294,0.283],
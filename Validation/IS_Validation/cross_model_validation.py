@@ -0,0 +1,60 @@
+import os
+import argparse
+import cobra
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dropout_utils import single_dropout
+from exchange_map import NAMESPACES, exchange_table, register_translated_media
+from validation_scripts_annotated import VALIDATIONS, STORE, validate_medium
+########################## NOTES ON CROSS MODEL VALIDATION ##########################
+#   This script runs the single component dropout validation of validation_scripts_annotated.py on iGR632 and on the two other LGG models in Model/ (AGORA1.02 and MERLIN-iCC568)
+#   Steps of analysis:
+        #   Each model runs in its own worker process, all models at the same time
+        #   The DM media are translated to the model's exchange IDs with the cached translation table of exchange_map (components without a matching exchange are left out and reported)
+        #   single_dropout on every VALIDATIONS medium with the model's own biomass objective, then the fold changes are mapped back to iGR632 exchange IDs
+        #   Fold changes are compared to the in vitro data exactly as for iGR632 (validate_medium) and written to the results store under the model's name
+        #   IV_v_IS_growth_rates.py and model_performance_heatmap.py read the full growth rates and metrics of every model from the store
+#   Usage:
+        # python cross_model_validation.py                          all three models
+        # python cross_model_validation.py --models AGORA MERLIN    only some
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Model')
+
+def run_model(name, dropout_processes=1):
+    """
+    Loads one model, translates the validation media and runs the dropouts. Returns the model name, the dropout results per VALIDATIONS entry (is_fc indexed by iGR632 IDs, full_growth) and the untranslated components per medium.
+    """
+    path = os.path.join(MODEL_DIR, NAMESPACES[name]['file'])
+    model = cobra.io.read_sbml_model(path)
+    table = exchange_table(path, name, model)
+    media, missing = register_translated_media(name, table, [v['dm'] for v in VALIDATIONS])
+    to_igr632 = {model_id: rxn_id for rxn_id, model_id in table.items() if model_id}
+    results = []
+    for v in VALIDATIONS:
+        is_fc, full_growth = single_dropout(model, media[v['dm']], objective=NAMESPACES[name]['objective'],
+                                            growth_floor=v['growth_floor'], processes=dropout_processes)
+        is_fc = is_fc.rename(index=to_igr632)
+        results.append((is_fc, full_growth))
+    return name, results, missing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dropout validation of several LGG models")
+    parser.add_argument('--models', nargs='+', default=list(NAMESPACES), choices=list(NAMESPACES))
+    parser.add_argument('--dropout-processes', type=int, default=1, help="worker processes per model for the dropouts")
+    args = parser.parse_args()
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=len(args.models)) as pool:
+        futures = [pool.submit(run_model, name, args.dropout_processes) for name in args.models]
+        for future in as_completed(futures):
+            name, results, missing = future.result()
+            for v, (is_fc, full_growth) in zip(VALIDATIONS, results):
+                if missing[v['dm']]:
+                    print(f"{name} {v['title']}: {len(missing[v['dm']])} components not in model: {', '.join(missing[v['dm']])}")
+                r = validate_medium(v, is_fc, full_growth, model=name, store=STORE)
+                rows.append({'model': name, 'medium': v['title'], 'full_growth': full_growth,
+                             **{k: r[k] for k in ('TN', 'FP', 'FN', 'TP', 'accuracy', 'recall', 'precision', 'specificity', 'fpr', 'roc_auc')}})
+            print(f"{name} done")
+    summary = pd.DataFrame(rows).set_index(['model', 'medium']).sort_index()
+    print(summary.round(3).to_string())
+    summary.to_csv('cross_model_validation.csv')
@@ -1,7 +1,9 @@
 ##### Generating final confusion matrix figure from data in Validation script #####
+# Counts are read from the results store written by the validation script, media missing from the store fall back to the published counts below
 
 import matplotlib.pyplot as plt
 import numpy as np
+from results_store import read_table
 from matplotlib.patches import Rectangle
 from matplotlib.gridspec import GridSpec
 
@@ -11,7 +13,14 @@ data = {
     'DM16' : [6, 4, 3, 2],
     'DM13' : [2, 3, 3, 4],
     'Sun et al.' : [21, 1, 17, 3]
-}
+}   # [TN, FP, FN, TP]
+
+STORE = 'validation_store'
+MEDIA_LABELS = {'57': 'DM57', '25': 'DM25', '16': 'DM16', '13': 'DM13', 'sun': 'Sun et al.'}
+stored = read_table(STORE, 'metrics', model='iGR632', columns=['TN', 'FP', 'FN', 'TP'])
+if stored is not None:
+    for _, row in stored.iterrows():
+        data[MEDIA_LABELS.get(row['medium'], row['medium'])] = [int(row[k]) for k in ['TN', 'FP', 'FN', 'TP']]
 
 media_colors = {
     'DM57': '#6f9969',
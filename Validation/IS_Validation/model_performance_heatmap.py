@@ -1,8 +1,13 @@
 ############## Summarizing model performance from Validation Script ################ 
-# Hard codes the model performance metrics from the validation script into a table using a heatmap structure
+# Reads the model performance metrics written by the validation script to the results store into a table using a heatmap structure
+# Media missing from the store fall back to the published values below
 
 import matplotlib.pyplot as plt
 import numpy as np
+from results_store import read_table
+
+STORE = 'validation_store'
+MEDIA_LABELS = {'57': 'DM57', '25': 'DM25', '16': 'DM16', '13': 'DM13', 'sun': 'Sun et al.'}
 
 metrics = ['Accuracy', 'Recall', 'Precision', 'Specificity', 'FPR']
 media = ['DM57', 'DM25', 'DM16', 'DM13', 'Sun et al.']
@@ -13,6 +18,10 @@ data_dict = {
     'DM13': [50, 57, 57, 40, 60],
     'Sun et al.': [57, 15, 75, 96, 5]
 }
+stored = read_table(STORE, 'metrics', model='iGR632', columns=['accuracy', 'recall', 'precision', 'specificity', 'fpr'])
+if stored is not None:
+    for _, row in stored.iterrows():
+        data_dict[MEDIA_LABELS.get(row['medium'], row['medium'])] = [int(round(100 * row[k])) for k in ['accuracy', 'recall', 'precision', 'specificity', 'fpr']]
 
 data_pct = np.array([data_dict[m] for m in media]).T  # transpose so rows=metrics
 media_colors = ['#6f9969', '#5c66a8', '#808fe1', '#454a74']
@@ -0,0 +1,28 @@
+import cobra
+from dropout_utils import multi_dropout, epistasis_matrix
+########################## NOTES ON MULTI DROPOUT SCREEN ##########################
+#   This script extends the single component dropout validation to double (and optionally triple) dropouts for each DM formulation
+#   Used to design the reduced media series (DM25 -> DM16 -> DM13 -> DM7) by finding components that can be removed together
+#   Steps of analysis:
+        #   load in model
+        #   For each DM, simulate every combination of up to MAX_ORDER components dropped together with multi_dropout
+            #   combinations containing a lethal single (or smaller) dropout are called lethal without a solve
+            #   combinations adding a component that the smaller combination's optimum does not take up keep its growth without a solve
+            #   the remaining combinations are solved across a worker pool
+        #   Save the full dropout table and the pairwise interaction matrix (epsilon_ab = W_ab - W_a*W_b, W = fold change of full media) to csv
+#   Growth floors are the same as in validation_scripts_annotated.py
+
+MAX_ORDER = 2   # 2 = pairs, 3 = pairs and triples
+SCREENS = {'57': 0.43, '25': 0.31, '16': 0.07, '13': 0.11}   # DM: growth floor
+
+if __name__ == "__main__":
+    tmodelc = cobra.io.read_sbml_model('iGR632_v37.xml')
+    for dm, growth_floor in SCREENS.items():
+        dropouts, full_growth = multi_dropout(tmodelc, dm, max_order=MAX_ORDER, growth_floor=growth_floor)
+        counts = dropouts['status'].value_counts()
+        print(f"DM{dm}: full growth {full_growth:.3f}, {len(dropouts)} combinations, "
+              f"{counts.get('solved', 0)} solved, {counts.get('lethal', 0)} pruned as lethal, {counts.get('inherited', 0)} inherited")
+        epsilon = epistasis_matrix(dropouts)
+        epsilon.to_csv(f"DM{dm}_pair_epistasis.csv")
+        dropouts['exchanges'] = dropouts['exchanges'].map("|".join)
+        dropouts.to_csv(f"DM{dm}_dropouts_order{MAX_ORDER}.csv", index=False)
@@ -4,6 +4,7 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from data_loader import read_excel_cached
 
 # === CONFIG ===
 xlsx_path = "All_rates.xlsx"  # path to your file
@@ -12,7 +13,7 @@ palette = ["#7FC97F", "#BEAED4", "#FDC086", "#FFFF99"]
 formula_order = ["DM13", "DM16", "DM25", "DM57"]  
 
 # === READ DATA ===
-df = pd.read_excel(xlsx_path, sheet_name='Full_Data_Fig', index_col=0)
+df = read_excel_cached(xlsx_path, sheet_name='Full_Data_Fig', index_col=0)
 df = df.reset_index().rename(columns={"index": "Component"}) 
 df.columns = df.columns.str.strip() 
 
@@ -0,0 +1,21 @@
+import os
+import sys
+import importlib.util
+import importlib.machinery
+
+#The modules in Utils are imported by short names (from run_fba import fba, import sim_cache, ...) while the files are named <name>_usage.py,
+#so the tests resolve the short names to those files
+UTILS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Utils')
+FILES = {'set_dms': 'set_DM_usage.py', 'pe_utils': 'PE_utils_usage.py'}
+
+class _UtilsFinder:
+    @staticmethod
+    def find_spec(name, path=None, target=None):
+        if '.' in name:
+            return None
+        path = os.path.join(UTILS, FILES.get(name, f"{name}_usage.py"))
+        if not os.path.exists(path):
+            return None
+        return importlib.util.spec_from_file_location(name, path)
+
+sys.meta_path.append(_UtilsFinder)
@@ -0,0 +1,36 @@
+import timeit
+import pytest
+
+cobra = pytest.importorskip('cobra')
+from model_index import get_index
+
+@pytest.fixture
+def model():
+    return cobra.io.load_model('textbook')
+
+def test_rebuilt_when_reactions_change(model):
+    index = get_index(model)
+    assert get_index(model) is index
+    model.add_reactions([cobra.Reaction('NEW')])
+    assert get_index(model) is not index
+    index = get_index(model)
+    model.remove_reactions([model.reactions.PGI])
+    index = get_index(model)
+    assert 'PGI' not in index.position
+    assert index.position['NEW'] == len(model.reactions) - 1
+
+def test_demand_and_sink_follow_bounds(model):
+    sink = cobra.Reaction('SK_atp_c', lower_bound=-1000, upper_bound=1000)
+    sink.add_metabolites({model.metabolites.atp_c: -1})
+    model.add_reactions([sink])
+    index = get_index(model)
+    assert index.is_class('SK_atp_c', 'sink')
+    sink.lower_bound = 0
+    assert get_index(model) is index
+    assert index.is_class('SK_atp_c', 'demand') and not index.is_class('SK_atp_c', 'sink')
+
+def test_lookup_cost_does_not_grow_with_the_model(model):
+    big = model.copy()
+    big.add_reactions([cobra.Reaction(f"R{i}") for i in range(20000)])
+    small_us, big_us = (min(timeit.repeat(lambda: get_index(m).reactions_in('e'), number=2000, repeat=5)) / 2000 * 1e6 for m in (model, big))
+    assert big_us < 5 * small_us + 5
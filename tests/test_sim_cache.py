@@ -0,0 +1,52 @@
+import pytest
+
+cobra = pytest.importorskip('cobra')
+import optlang.interface
+import sim_cache
+import sim_trace
+
+@pytest.fixture
+def model(tmp_path):
+    sim_cache.enable(str(tmp_path))
+    yield cobra.io.load_model('textbook')
+    sim_cache.disable()
+
+@sim_cache.cached
+def growth(model, objective='Biomass_Ecoli_core'):
+    with model:
+        model.objective = objective
+        return model.slim_optimize()
+
+def newest_active():
+    return list(sim_cache.entries())[-1]['active']
+
+def test_active_set_recorded_after_tracing_is_turned_off(model):
+    original = optlang.interface.Model.optimize
+    sim_trace.enable()
+    growth(model)
+    assert newest_active()
+    sim_trace.disable()
+    model.reactions.EX_glc__D_e.lower_bound = -9    #active reaction tightened, a miss
+    growth(model)
+    assert 'EX_glc__D_e' in newest_active()
+    assert optlang.interface.Model.optimize is original
+
+def test_tracing_turned_on_inside_a_recording(model):
+    original = optlang.interface.Model.optimize
+    with sim_cache._recording() as active:
+        sim_trace.enable()
+        model.slim_optimize()
+    sim_trace.disable()
+    assert 'EX_glc__D_e' in active
+    assert optlang.interface.Model.optimize is original
+
+def test_cobra_methods_wrapped_only_while_enabled(model):
+    assert hasattr(cobra.Reaction.__dict__['add_metabolites'], '_wrapped_by_sim_cache')
+    digest = sim_cache.model_digest(model)
+    model.reactions.PGI.id = 'PGI_renamed'
+    assert sim_cache.model_digest(model) != digest
+    sim_cache.disable()
+    assert not hasattr(cobra.Reaction.__dict__['add_metabolites'], '_wrapped_by_sim_cache')
+    digest = sim_cache.model_digest(model)
+    model.reactions.PGI_renamed.upper_bound = 5
+    assert sim_cache.model_digest(model) != digest
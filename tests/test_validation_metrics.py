@@ -0,0 +1,17 @@
+import pytest
+from validation_metrics import pr_curve, roc_curve
+
+#iv 0.1 is deleterious (positive) at the 0.8 threshold, 1.0 no effect. IS values tie at 0.5 across the two classes
+IV = [0.1, 1.0, 0.1, 1.0, 0.1]
+IS = [0.2, 0.3, 0.5, 0.5, 0.9]
+
+def test_pr_curve_with_tied_scores():
+    pr, average_precision = pr_curve(IV, IS)
+    assert pr['is_threshold'].tolist() == [0.2, 0.3, 0.5, 0.9]    #+inf is the same point as 0.9
+    assert pr['recall'].tolist() == pytest.approx([1 / 3, 1 / 3, 2 / 3, 1])
+    assert pr['precision'].tolist() == pytest.approx([1, 1 / 2, 1 / 2, 3 / 5])
+    assert average_precision == pytest.approx(1 / 3 * 1 + 1 / 3 * 1 / 2 + 1 / 3 * 3 / 5)
+
+def test_roc_auc_counts_ties_as_half():
+    _, auc = roc_curve(IV, IS)
+    assert auc == pytest.approx(2.5 / 6)    #2 of the 6 positive/negative pairs ranked right, 1 tied